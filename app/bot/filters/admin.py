@@ -1,7 +1,14 @@
 from aiogram.filters import Filter
 from aiogram.types import Message
+from aiogram.exceptions import TelegramAPIError
 from aiogram import Bot
 
+from app.cache import admin_status_cache, chat_admins_cache, MISSING
+from app.config import settings
+
+
+ADMIN_STATUSES = ("creator", "administrator")
+
 
 class IsAdminFilter(Filter):
     """Filter to check if user is admin in the chat"""
@@ -10,5 +17,49 @@ class IsAdminFilter(Filter):
         if message.chat.type == "private":
             return False
         
-        member = await bot.get_chat_member(message.chat.id, message.from_user.id)
-        return member.status in ["creator", "administrator"]
+        return await is_chat_admin(bot, message.chat.id, message.from_user.id)
+
+
+async def is_chat_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
+    """Check admin status, using the cache before asking Telegram"""
+    key = (chat_id, user_id)
+    is_admin = admin_status_cache.get(key)
+    if is_admin is not MISSING:
+        return is_admin
+
+    admin_ids = chat_admins_cache.get(chat_id)
+    if admin_ids is MISSING and settings.ADMIN_CACHE_PREFILL:
+        # One call answers the question for every member of the chat
+        try:
+            admins = await bot.get_chat_administrators(chat_id)
+        except TelegramAPIError:
+            admins = None
+        if admins is not None:
+            admin_ids = frozenset(member.user.id for member in admins)
+            chat_admins_cache.set(chat_id, admin_ids)
+
+    if admin_ids is not MISSING:
+        is_admin = user_id in admin_ids
+    else:
+        member = await bot.get_chat_member(chat_id, user_id)
+        is_admin = member.status in ADMIN_STATUSES
+
+    admin_status_cache.set(key, is_admin)
+    return is_admin
+
+
+def update_admin_status(chat_id: int, user_id: int, status: str) -> None:
+    """Apply a chat member status change to the admin caches"""
+    is_admin = status in ADMIN_STATUSES
+    admin_status_cache.set((chat_id, user_id), is_admin)
+
+    admin_ids = chat_admins_cache.get(chat_id)
+    if admin_ids is not MISSING and (user_id in admin_ids) != is_admin:
+        admin_ids = admin_ids | {user_id} if is_admin else admin_ids - {user_id}
+        chat_admins_cache.set(chat_id, admin_ids)
+
+
+def invalidate_chat_admins(chat_id: int) -> None:
+    """Forget everything cached about admins of a chat"""
+    chat_admins_cache.invalidate(chat_id)
+    admin_status_cache.invalidate_if(lambda key: key[0] == chat_id)
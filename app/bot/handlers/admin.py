@@ -1,11 +1,18 @@
-from aiogram import Router, F
+import csv
+import io
+import tempfile
+from pathlib import Path
+
+from aiogram import Router, F, Bot
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.types import Message, FSInputFile
 
+from app.config import settings
 from app.database.repositories.group import GroupRepository
 from app.database.repositories.location import LocationRepository
 from app.bot.middlewares.i18n import I18nMiddleware
 from app.bot.filters.admin import IsAdminFilter
+from app.bot.utils.location_pack import import_locations, pack_format, read_pack, write_pack
 
 
 router = Router()
@@ -23,7 +30,7 @@ async def cmd_settings(
     args = message.text.split()[1:] if len(message.text.split()) > 1 else []
     
     # Ensure group exists
-    group, _ = await group_repo.get_or_create(
+    group = await group_repo.ensure(
         group_id=message.chat.id,
         title=message.chat.title
     )
@@ -36,15 +43,18 @@ async def cmd_settings(
             language=group.language,
             min_players=group.min_players,
             max_players=group.max_players,
-            spy_percentage=group.spy_percentage
+            spy_percentage=group.spy_percentage,
+            turn_timeout=group.turn_timeout
         )
         await message.answer(text)
         return
     
     # Update settings
-    if len(args) == 4:
+    if len(args) in (4, 5):
         try:
-            new_lang, min_players, max_players, spy_percentage = args
+            new_lang, min_players, max_players, spy_percentage = args[:4]
+            # Turn time is optional and kept as is when omitted
+            turn_timeout = int(args[4]) if len(args) == 5 else group.turn_timeout
             
             if new_lang not in ["ru", "en", "az"]:
                 raise ValueError("Invalid language")
@@ -59,12 +69,16 @@ async def cmd_settings(
             if not (0 < spy_p <= 50):
                 raise ValueError("Invalid spy percentage")
             
+            if turn_timeout != 0 and not (15 <= turn_timeout <= 3600):
+                raise ValueError("Invalid turn timeout")
+
             await group_repo.update_settings(
                 group_id=message.chat.id,
                 language=new_lang,
                 min_players=min_p,
                 max_players=max_p,
-                spy_percentage=spy_p
+                spy_percentage=spy_p,
+                turn_timeout=turn_timeout
             )
             
             text = i18n.get_text(
@@ -73,7 +87,8 @@ async def cmd_settings(
                 language=new_lang,
                 min_players=min_p,
                 max_players=max_p,
-                spy_percentage=spy_p
+                spy_percentage=spy_p,
+                turn_timeout=turn_timeout
             )
             await message.answer(text)
             
@@ -95,7 +110,7 @@ async def cmd_addlocation(
 ):
     """Handle /addlocation command"""
     # Ensure group exists
-    await group_repo.get_or_create(
+    await group_repo.ensure(
         group_id=message.chat.id,
         title=message.chat.title
     )
@@ -125,15 +140,86 @@ async def cmd_addlocation(
         "az": az_name
     }
     
-    await location_repo.create(
+    location = await location_repo.create(
         name_translations=translations,
         group_id=message.chat.id
     )
+    if not location:
+        text = i18n.get_text(lang, "location.exists")
+        await message.answer(text)
+        return
     
     text = i18n.get_text(lang, "location.added", ru=ru_name, en=en_name, az=az_name)
     await message.answer(text)
 
 
+@router.message(Command("importlocations"), F.chat.type.in_(["group", "supergroup"]), IsAdminFilter())
+async def cmd_importlocations(
+    message: Message,
+    bot: Bot,
+    group_repo: GroupRepository,
+    location_repo: LocationRepository,
+    i18n: I18nMiddleware,
+    lang: str
+):
+    """Handle /importlocations as the caption of a CSV/JSON pack, or as a reply to one"""
+    document = message.document or (message.reply_to_message and message.reply_to_message.document)
+    fmt = pack_format(document.file_name) if document else None
+    if not fmt:
+        text = i18n.get_text(lang, "location.import_usage")
+        await message.answer(text)
+        return
+
+    if document.file_size and document.file_size > settings.LOCATION_IMPORT_MAX_SIZE:
+        max_mb = settings.LOCATION_IMPORT_MAX_SIZE // (1024 * 1024)
+        text = i18n.get_text(lang, "location.import_too_large", max_mb=max_mb)
+        await message.answer(text)
+        return
+
+    await group_repo.ensure(
+        group_id=message.chat.id,
+        title=message.chat.title
+    )
+
+    # Downloaded to disk and parsed as a stream, so the pack is never held in memory
+    with tempfile.TemporaryFile() as file:
+        await bot.download(document, destination=file)
+        stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            # A pack that fails halfway is rolled back as a whole
+            async with location_repo.session.begin_nested():
+                result = await import_locations(location_repo, read_pack(stream, fmt), message.chat.id)
+        except (ValueError, csv.Error):
+            text = i18n.get_text(lang, "location.import_error")
+            await message.answer(text)
+            return
+
+    text = i18n.get_text(lang, "location.imported", added=result.added, skipped=result.skipped, invalid=result.invalid)
+    await message.answer(text)
+
+
+@router.message(Command("exportlocations"), F.chat.type.in_(["group", "supergroup"]), IsAdminFilter())
+async def cmd_exportlocations(
+    message: Message,
+    location_repo: LocationRepository,
+    i18n: I18nMiddleware,
+    lang: str
+):
+    """Handle /exportlocations: send the group's own locations as a CSV pack"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "locations.csv"
+        with path.open("w", encoding="utf-8", newline="") as file:
+            count = await write_pack(file, "csv", location_repo.stream_for_group(message.chat.id))
+
+        if not count:
+            text = i18n.get_text(lang, "location.export_empty")
+            await message.answer(text)
+            return
+
+        text = i18n.get_text(lang, "location.exported", count=count)
+        await message.answer_document(FSInputFile(path), caption=text)
+
+
 @router.message(Command("settings"), F.chat.type.in_(["group", "supergroup"]), ~IsAdminFilter())
 async def cmd_settings_not_admin(
     message: Message,
@@ -146,11 +232,13 @@ async def cmd_settings_not_admin(
 
 
 @router.message(Command("addlocation"), F.chat.type.in_(["group", "supergroup"]), ~IsAdminFilter())
+@router.message(Command("importlocations"), F.chat.type.in_(["group", "supergroup"]), ~IsAdminFilter())
+@router.message(Command("exportlocations"), F.chat.type.in_(["group", "supergroup"]), ~IsAdminFilter())
 async def cmd_addlocation_not_admin(
     message: Message,
     i18n: I18nMiddleware,
     lang: str
 ):
-    """Handle /addlocation from non-admin"""
+    """Handle location commands from non-admin"""
     text = i18n.get_text(lang, "settings.not_admin")
     await message.answer(text)
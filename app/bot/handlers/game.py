@@ -1,14 +1,15 @@
 from aiogram import Router, F, Bot
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
-from aiogram.exceptions import TelegramBadRequest
 from sqlalchemy import select
 
+from app.config import settings
 from app.database.repositories.user import UserRepository
 from app.database.repositories.group import GroupRepository
 from app.database.repositories.location import LocationRepository
 from app.database.repositories.game import GameRepository
 from app.database.models import GameStatus, Game
+from app.cache import active_game_index
 from app.bot.middlewares.i18n import I18nMiddleware
 from app.bot.filters.admin import IsAdminFilter
 from app.bot.keyboards.inline import (
@@ -20,10 +21,12 @@ from app.bot.keyboards.inline import (
 from app.bot.utils.game_logic import (
     select_spies,
     shuffle_players,
-    select_random_location,
-    format_player_list,
-    get_location_name
+    get_location_name,
+    match_location
 )
+from app.bot.utils.broadcast import send_private_messages
+from app.bot.utils.registration import registration_updater
+from app.bot.utils.turn_timer import send_turn_prompt, turn_timer
 
 
 router = Router()
@@ -39,7 +42,7 @@ async def cmd_startgame(
 ):
     """Start game registration"""
     # Ensure group exists
-    group, _ = await group_repo.get_or_create(
+    group = await group_repo.ensure(
         group_id=message.chat.id,
         title=message.chat.title
     )
@@ -62,6 +65,7 @@ async def cmd_startgame(
 @router.callback_query(F.data == "game_join")
 async def callback_game_join(
     callback: CallbackQuery,
+    bot: Bot,
     user_repo: UserRepository,
     group_repo: GroupRepository,
     game_repo: GameRepository,
@@ -69,15 +73,14 @@ async def callback_game_join(
 ):
     """Handle player joining game"""
     # Check if user is registered
-    user = await user_repo.get_by_id(callback.from_user.id)
-    if not user:
+    if not await user_repo.is_registered(callback.from_user.id):
         text = i18n.get_text("ru", "game.not_registered")
         await callback.answer(text, show_alert=True)
         return
 
     # Get active game
-    group = await group_repo.get_by_id(callback.message.chat.id)
-    game = await game_repo.get_active_game_for_group(callback.message.chat.id, load_players=True)
+    group = await group_repo.get_settings(callback.message.chat.id)
+    game = await game_repo.get_active_snapshot_for_group(callback.message.chat.id)
 
     if not game or game.status != GameStatus.REGISTRATION:
         text = i18n.get_text(group.language, "game.no_active_game")
@@ -85,7 +88,7 @@ async def callback_game_join(
         return
 
     # Check if already joined
-    if any(p.user_id == callback.from_user.id for p in game.players):
+    if game.get_player(callback.from_user.id):
         text = i18n.get_text(group.language, "game.already_joined")
         await callback.answer(text, show_alert=True)
         return
@@ -102,24 +105,18 @@ async def callback_game_join(
     text = i18n.get_text(group.language, "game.joined")
     await callback.answer(text)
 
-    # Update game message
-    game = await game_repo.get_by_id(game.id, load_players=True)
-    players_text = format_player_list(game.players, group.language)
-    status_text = i18n.get_text(
-        group.language,
-        "game.players_list",
-        count=len(game.players),
-        players=players_text
+    # Update game message; joins close together are rendered in one edit
+    registration_updater.schedule(
+        bot,
+        i18n,
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.message_id,
+        game_id=game.id,
+        lang=group.language,
+        base_text=i18n.get_text(group.language, "game.announcement"),
+        reply_markup=get_game_join_keyboard(i18n, group.language)
     )
 
-    try:
-        await callback.message.edit_text(
-            callback.message.text + "\n\n" + status_text,
-            reply_markup=callback.message.reply_markup
-        )
-    except TelegramBadRequest:
-        pass
-
 
 @router.callback_query(F.data == "game_pass")
 async def callback_game_pass(
@@ -142,8 +139,8 @@ async def cmd_endregister(
     i18n: I18nMiddleware
 ):
     """End registration and start game"""
-    group = await group_repo.get_by_id(message.chat.id)
-    game = await game_repo.get_active_game_for_group(message.chat.id, load_players=True)
+    group = await group_repo.get_settings(message.chat.id)
+    game = await game_repo.get_active_snapshot_for_group(message.chat.id)
 
     if not game or game.status != GameStatus.REGISTRATION:
         text = i18n.get_text(group.language, "game.no_active_game")
@@ -161,15 +158,15 @@ async def cmd_endregister(
         await message.answer(text)
         return
 
-    # Get locations
-    locations = await location_repo.get_all_for_group(message.chat.id)
-    if not locations:
+    # Select random location, avoiding the ones played recently
+    location = await location_repo.pick_random_for_group(
+        message.chat.id,
+        exclude_recent=settings.LOCATION_REPEAT_WINDOW
+    )
+    if not location:
         await message.answer("❌ No locations available!")
         return
 
-    # Select random location
-    location = select_random_location(locations)
-
     # Select spies
     player_ids = [p.user_id for p in game.players]
     spy_ids = select_spies(player_ids, group.spy_percentage)
@@ -178,28 +175,31 @@ async def cmd_endregister(
     player_order = shuffle_players(player_ids)
 
     # Start game
-    await game_repo.start_game(game.id, location.id, spy_ids, player_order)
+    started = await game_repo.start_game(game.id, location.id, spy_ids, player_order, turn_timeout=group.turn_timeout)
+    if started:
+        turn_timer.track(started)
+
+    # Roles go out one message per player: don't hold the connection while they wait
+    await game_repo.session.commit()
 
     # Send game started message
     text = i18n.get_text(group.language, "game.started")
     await message.answer(text, reply_markup=get_reveal_role_keyboard(i18n, group.language))
 
-    # Send roles to private messages (if user started bot)
+    # Send roles to private messages (if user started bot), concurrently within rate limits
     location_name = get_location_name(location, group.language)
+    spy_text = i18n.get_text(group.language, "game.location_spy")
+    normal_text = i18n.get_text(group.language, "game.location_normal", location=location_name)
 
-    for player in game.players:
-        is_spy = player.user_id in spy_ids
+    unreachable = await send_private_messages(bot, [
+        (player.user_id, spy_text if player.user_id in spy_ids else normal_text)
+        for player in game.players
+    ])
 
-        try:
-            if is_spy:
-                pm_text = i18n.get_text(group.language, "game.location_spy")
-            else:
-                pm_text = i18n.get_text(group.language, "game.location_normal", location=location_name)
-
-            await bot.send_message(player.user_id, pm_text)
-        except TelegramBadRequest:
-            # User hasn't started bot yet
-            pass
+    if unreachable:
+        names = ", ".join(player.display_name for player in game.players if player.user_id in unreachable)
+        text = i18n.get_text(group.language, "game.roles_unreachable", players=names)
+        await message.answer(text)
 
 
 @router.callback_query(F.data == "reveal_role")
@@ -216,8 +216,8 @@ async def callback_reveal_role(
         await callback.answer("Use this button in the group!", show_alert=True)
         return
 
-    group = await group_repo.get_by_id(callback.message.chat.id)
-    game = await game_repo.get_active_game_for_group(callback.message.chat.id, load_players=True)
+    group = await group_repo.get_settings(callback.message.chat.id)
+    game = await game_repo.get_active_snapshot_for_group(callback.message.chat.id)
 
     if not game or game.status != GameStatus.IN_PROGRESS:
         text = i18n.get_text(group.language, "game.no_active_game")
@@ -225,7 +225,7 @@ async def callback_reveal_role(
         return
 
     # Find player
-    player = next((p for p in game.players if p.user_id == callback.from_user.id), None)
+    player = game.get_player(callback.from_user.id)
     if not player:
         await callback.answer("You are not in this game!", show_alert=True)
         return
@@ -252,8 +252,8 @@ async def cmd_next(
     i18n: I18nMiddleware
 ):
     """Move to next player"""
-    group = await group_repo.get_by_id(message.chat.id)
-    game = await game_repo.get_active_game_for_group(message.chat.id, load_players=True)
+    group = await group_repo.get_settings(message.chat.id)
+    game = await game_repo.get_active_game_for_group(message.chat.id)
 
     if not game or game.status != GameStatus.IN_PROGRESS:
         text = i18n.get_text(group.language, "game.no_active_game")
@@ -261,28 +261,16 @@ async def cmd_next(
         return
 
     # Move to next player
-    await game_repo.next_player(game.id)
-    game = await game_repo.get_by_id(game.id, load_players=True)
+    moved = await game_repo.next_player(game.id, turn_timeout=group.turn_timeout)
+    if not moved:
+        text = i18n.get_text(group.language, "game.no_active_game")
+        await message.answer(text)
+        return
 
-    # Get current player
-    current_user_id = game.player_order[game.current_player_index]
-    current_player = next(p for p in game.players if p.user_id == current_user_id)
+    turn_timer.track(moved.game)
 
     # Mention player
-    name = current_player.user.first_name or current_player.user.username or f"User {current_user_id}"
-    text = i18n.get_text(group.language, "game.next_player", name=name)
-
-    try:
-        await message.answer(text)
-        # Try to mention user
-        await bot.send_message(
-            message.chat.id,
-            f"<a href='tg://user?id={current_user_id}'>{name}</a> " +
-            i18n.get_text(group.language, "game.your_turn"),
-            parse_mode="HTML"
-        )
-    except TelegramBadRequest:
-        await message.answer(text)
+    await send_turn_prompt(bot, message.chat.id, moved.current_user_id, moved.player_name, group.language, i18n)
 
 
 @router.message(Command("endgame"), F.chat.type.in_(["group", "supergroup"]), IsAdminFilter())
@@ -293,7 +281,7 @@ async def cmd_endgame(
     i18n: I18nMiddleware
 ):
     """End current game"""
-    group = await group_repo.get_by_id(message.chat.id)
+    group = await group_repo.get_settings(message.chat.id)
     game = await game_repo.get_active_game_for_group(message.chat.id)
 
     if not game:
@@ -315,7 +303,7 @@ async def cmd_resumegame(
     i18n: I18nMiddleware
 ):
     """Resume finished game (undo endgame)"""
-    group = await group_repo.get_by_id(message.chat.id)
+    group = await group_repo.get_settings(message.chat.id)
 
     # Get the last game (even if finished)
     result = await game_repo.session.execute(
@@ -328,7 +316,9 @@ async def cmd_resumegame(
         await message.answer(text)
         return
 
-    await game_repo.resume_game(game.id)
+    resumed = await game_repo.resume_game(game.id, turn_timeout=group.turn_timeout)
+    if resumed:
+        turn_timer.track(resumed)
 
     text = i18n.get_text(group.language, "game.game_resumed")
     await message.answer(text)
@@ -343,8 +333,8 @@ async def cmd_vote(
     i18n: I18nMiddleware
 ):
     """Vote for a player as spy"""
-    group = await group_repo.get_by_id(message.chat.id)
-    game = await game_repo.get_active_game_for_group(message.chat.id, load_players=True)
+    group = await group_repo.get_settings(message.chat.id)
+    game = await game_repo.get_active_snapshot_for_group(message.chat.id)
 
     if not game or game.status != GameStatus.IN_PROGRESS:
         text = i18n.get_text(group.language, "game.no_active_game")
@@ -352,7 +342,7 @@ async def cmd_vote(
         return
 
     # Check if voter is in game
-    voter = next((p for p in game.players if p.user_id == message.from_user.id), None)
+    voter = game.get_player(message.from_user.id)
     if not voter:
         text = i18n.get_text(group.language, "game.not_in_game")
         await message.answer(text)
@@ -371,9 +361,9 @@ async def cmd_vote(
         username = message.text.split()[1].lstrip('@')
         # Find player by username
         for p in game.players:
-            if p.user.username and p.user.username.lower() == username.lower():
+            if p.username and p.username.lower() == username.lower():
                 voted_for_id = p.user_id
-                voted_name = p.user.first_name or p.user.username
+                voted_name = p.first_name or p.username
                 break
 
     if not voted_for_id:
@@ -382,7 +372,7 @@ async def cmd_vote(
         return
 
     # Check if voted user is in game
-    voted_player = next((p for p in game.players if p.user_id == voted_for_id), None)
+    voted_player = game.get_player(voted_for_id)
     if not voted_player:
         text = i18n.get_text(group.language, "game.vote_not_player")
         await message.answer(text)
@@ -395,27 +385,32 @@ async def cmd_vote(
         return
 
     # Register vote
-    await game_repo.add_vote(game.id, message.from_user.id, voted_for_id)
+    if not await game_repo.add_vote(game.id, message.from_user.id, voted_for_id):
+        text = i18n.get_text(group.language, "game.no_active_game")
+        await message.answer(text)
+        return
+
+    # Check if all voted, ending the game in the same transaction as the vote
+    tally = await game_repo.get_vote_tally(game.id)
+    if tally.all_voted:
+        location = await location_repo.get_by_id(game.location_id)
+        await game_repo.end_game(game.id)
+    await game_repo.session.commit()
 
     text = i18n.get_text(group.language, "game.vote_registered", name=voted_name)
     await message.reply(text)
 
-    # Check if all voted
-    game = await game_repo.get_by_id(game.id, load_players=True)
-    if len(game.votes) >= len(game.players):
-        # Count votes
-        from collections import Counter
-        vote_counts = Counter(game.votes.values())
-        most_voted_id, vote_count = vote_counts.most_common(1)[0]
+    if tally.all_voted:
+        most_voted_id, vote_count = tally.counts[0]
 
         # Get names
-        accused_player = next(p for p in game.players if p.user_id == most_voted_id)
-        accused_name = accused_player.user.first_name or accused_player.user.username or f"User {most_voted_id}"
+        accused_player = game.get_player(most_voted_id)
+        accused_name = game.player_name(most_voted_id)
 
         # Show results
         results_text = "\n".join([
-            f"• {next((p.user.first_name or p.user.username for p in game.players if p.user_id == uid), f'User {uid}')}: {count} голосов"
-            for uid, count in vote_counts.most_common()
+            f"• {game.player_name(uid)}: {count} голосов"
+            for uid, count in tally.counts
         ])
 
         text = i18n.get_text(group.language, "game.vote_results",
@@ -425,24 +420,22 @@ async def cmd_vote(
         await message.answer(text)
 
         # Check if spy
-        location = await location_repo.get_by_id(game.location_id)
         location_name = get_location_name(location, group.language)
 
         if accused_player.is_spy:
-            spy_name = accused_player.user.first_name or accused_player.user.username
+            spy_name = accused_player.first_name or accused_player.username
             text = i18n.get_text(group.language, "game.spy_found",
                                 spy=spy_name,
                                 location=location_name)
         else:
             spy_player = next(p for p in game.players if p.is_spy)
-            spy_name = spy_player.user.first_name or spy_player.user.username
+            spy_name = spy_player.first_name or spy_player.username
             text = i18n.get_text(group.language, "game.spy_escaped",
                                 accused=accused_name,
                                 spy=spy_name,
                                 location=location_name)
 
         await message.answer(text)
-        await game_repo.end_game(game.id)
 
 
 @router.message(Command("guess"), F.chat.type.in_(["group", "supergroup"]))
@@ -454,10 +447,8 @@ async def cmd_guess(
     i18n: I18nMiddleware
 ):
     """Spy guesses the location with fuzzy matching"""
-    from rapidfuzz import fuzz
-
-    group = await group_repo.get_by_id(message.chat.id)
-    game = await game_repo.get_active_game_for_group(message.chat.id, load_players=True)
+    group = await group_repo.get_settings(message.chat.id)
+    game = await game_repo.get_active_snapshot_for_group(message.chat.id)
 
     if not game or game.status != GameStatus.IN_PROGRESS:
         text = i18n.get_text(group.language, "game.no_active_game")
@@ -465,7 +456,7 @@ async def cmd_guess(
         return
 
     # Check if player is spy
-    player = next((p for p in game.players if p.user_id == message.from_user.id), None)
+    player = game.get_player(message.from_user.id)
     if not player:
         text = i18n.get_text(group.language, "game.not_in_game")
         await message.answer(text)
@@ -487,10 +478,12 @@ async def cmd_guess(
     # Get location
     location = await location_repo.get_by_id(game.location_id)
     location_name = get_location_name(location, group.language)
-    spy_name = player.user.first_name or player.user.username
+    spy_name = player.first_name or player.username
 
-    # Fuzzy matching: calculate similarity
-    similarity = fuzz.ratio(guess.lower(), location_name.lower())
+    # Fuzzy matching against names of all locations in every language:
+    # naming some other location is a wrong guess even if it resembles this one
+    match = match_location(guess, await location_repo.get_name_indexes(message.chat.id), cutoff=70)
+    similarity = match[1] if match and match[0] == game.location_id else 0
 
     # Check result based on similarity
     if similarity >= 85:
@@ -498,20 +491,20 @@ async def cmd_guess(
         text = i18n.get_text(group.language, "game.guess_correct",
                             location=location_name,
                             spy=spy_name)
-        await message.answer(text)
         await game_repo.end_game(game.id)
+        await message.answer(text)
     elif similarity >= 70:
         # Medium similarity (70-84%) - suggest correct name
         text = i18n.get_text(group.language, "game.guess_close",
                             location=location_name)
         await message.answer(text)
     else:
-        # Low similarity (<70%) - wrong answer, game ends
+        # Low similarity (<70%) or another location named - wrong answer, game ends
         text = i18n.get_text(group.language, "game.guess_wrong",
                             location=location_name,
                             guess=guess)
-        await message.answer(text)
         await game_repo.end_game(game.id)
+        await message.answer(text)
 
 
 # Auto-next handler for reply messages
@@ -524,48 +517,32 @@ async def handle_reply_to_turn(
     i18n: I18nMiddleware
 ):
     """Auto /next when player replies to their turn message"""
-    game = await game_repo.get_active_game_for_group(message.chat.id, load_players=True)
-
-    if not game or game.status != GameStatus.IN_PROGRESS:
+    # Runs for every reply in every group, so everything that needs no I/O comes first:
+    # the reply must answer the bot's turn message, sent by the player whose turn it is
+    reply = message.reply_to_message
+    if not reply.from_user or reply.from_user.id != bot.id:
         return
-
-    # Check if replying to bot's message about their turn
-    if not message.reply_to_message.from_user.is_bot:
+    if not reply.text or "⏰" not in reply.text:
         return
 
-    # Check if this is the current player
-    current_user_id = game.player_order[game.current_player_index]
-    if message.from_user.id != current_user_id:
+    turn = active_game_index.get(message.chat.id)
+    if not turn or message.from_user.id != turn.current_user_id:
         return
 
-    # Check if bot's message mentions this user (your turn message)
-    if not message.reply_to_message.text or "⏰" not in message.reply_to_message.text:
-        return
-
-    # Move to next player
-    await game_repo.next_player(game.id)
-    game = await game_repo.get_by_id(game.id, load_players=True)
+    group = await group_repo.get_settings(message.chat.id)
 
-    # Get next player
-    next_user_id = game.player_order[game.current_player_index]
-    next_player = next(p for p in game.players if p.user_id == next_user_id)
+    # Move to next player, unless someone else moved the turn meanwhile
+    moved = await game_repo.next_player(
+        turn.game_id,
+        expected_user_id=message.from_user.id,
+        turn_timeout=group.turn_timeout
+    )
+    if not moved:
+        return
+    turn_timer.track(moved.game)
 
     # Mention player
-    name = next_player.user.first_name or next_player.user.username or f"User {next_user_id}"
-    text = i18n.get_text(group.language, "game.next_player", name=name)
-
-    group = await group_repo.get_by_id(message.chat.id)
-
-    try:
-        await message.answer(text)
-        await bot.send_message(
-            message.chat.id,
-            f"<a href='tg://user?id={next_user_id}'>{name}</a> " +
-            i18n.get_text(group.language, "game.your_turn"),
-            parse_mode="HTML"
-        )
-    except TelegramBadRequest:
-        await message.answer(text)
+    await send_turn_prompt(bot, message.chat.id, moved.current_user_id, moved.player_name, group.language, i18n)
 
 
 # Non-admin game commands handlers
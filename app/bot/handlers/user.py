@@ -73,7 +73,7 @@ async def bot_added_to_group(
     group_repo: GroupRepository
 ):
     """Handle bot being added to a group"""
-    await group_repo.get_or_create(
+    await group_repo.ensure(
         group_id=event.chat.id,
         title=event.chat.title,
         language="ru"
@@ -89,15 +89,20 @@ async def user_joined_group(
 ):
     """Handle user joining a group"""
     # Ensure group exists
-    group, _ = await group_repo.get_or_create(
+    group = await group_repo.ensure(
         group_id=event.chat.id,
         title=event.chat.title
     )
     
-    # Check if user exists
-    user = await user_repo.get_by_id(event.new_chat_member.user.id)
-    
-    if not user:
+    # Auto-register: update user info (single statement, tells whether the user is registered)
+    registered = await user_repo.update_profile(
+        user_id=event.new_chat_member.user.id,
+        username=event.new_chat_member.user.username,
+        first_name=event.new_chat_member.user.first_name,
+        last_name=event.new_chat_member.user.last_name
+    )
+
+    if not registered:
         # Send welcome message with registration button
         name = event.new_chat_member.user.first_name or event.new_chat_member.user.username
         text = i18n.get_text(group.language, "start.group_welcome", name=name)
@@ -107,11 +112,3 @@ async def user_joined_group(
             text=text,
             reply_markup=get_registration_keyboard(i18n, group.language)
         )
-    else:
-        # Auto-register: update user info
-        await user_repo.get_or_create(
-            user_id=event.new_chat_member.user.id,
-            username=event.new_chat_member.user.username,
-            first_name=event.new_chat_member.user.first_name,
-            last_name=event.new_chat_member.user.last_name
-        )
@@ -1,7 +1,14 @@
+from functools import lru_cache
+from typing import Sequence
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from app.bot.middlewares.i18n import I18nMiddleware
+from app.database.snapshots import PlayerSnapshot
 
 
+# Static keyboards depend only on language, so each is built once per language
+# and the same markup instance is reused for every message.
+@lru_cache(maxsize=16)
 def get_registration_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboardMarkup:
     """Get registration keyboard"""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -12,6 +19,7 @@ def get_registration_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboard
     ])
 
 
+@lru_cache(maxsize=16)
 def get_game_join_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboardMarkup:
     """Get game join keyboard"""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -28,6 +36,7 @@ def get_game_join_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboardMar
     ])
 
 
+@lru_cache(maxsize=16)
 def get_reveal_role_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboardMarkup:
     """Get reveal role keyboard"""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -38,6 +47,7 @@ def get_reveal_role_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboardM
     ])
 
 
+@lru_cache(maxsize=16)
 def get_game_actions_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboardMarkup:
     """Get game actions keyboard"""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -56,14 +66,29 @@ def get_game_actions_keyboard(i18n: I18nMiddleware, lang: str) -> InlineKeyboard
     ])
 
 
-def get_player_selection_keyboard(players: list, game_id: int) -> InlineKeyboardMarkup:
+def warm_up_keyboards(i18n: I18nMiddleware) -> None:
+    """Build static keyboards for every loaded language"""
+    for lang in i18n.translations:
+        get_registration_keyboard(i18n, lang)
+        get_game_join_keyboard(i18n, lang)
+        get_reveal_role_keyboard(i18n, lang)
+        get_game_actions_keyboard(i18n, lang)
+
+
+def get_player_selection_keyboard(players: Sequence[PlayerSnapshot], game_id: int) -> InlineKeyboardMarkup:
     """Get player selection keyboard for accusations"""
+    entries = tuple((player.user_id, player.display_name) for player in players)
+    return _build_player_selection_keyboard(game_id, entries)
+
+
+@lru_cache(maxsize=1024)
+def _build_player_selection_keyboard(game_id: int, entries: tuple[tuple[int, str], ...]) -> InlineKeyboardMarkup:
+    """Build (and cache per game and player set) the accusation keyboard"""
     buttons = []
-    for player in players:
-        name = player.user.first_name or player.user.username or f"User {player.user_id}"
+    for user_id, name in entries:
         buttons.append([InlineKeyboardButton(
             text=name,
-            callback_data=f"accuse_{game_id}_{player.user_id}"
+            callback_data=f"accuse_{game_id}_{user_id}"
         )])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
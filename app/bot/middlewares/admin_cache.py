@@ -0,0 +1,24 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, ChatMemberUpdated
+
+from app.bot.filters.admin import update_admin_status, invalidate_chat_admins
+
+
+class AdminCacheMiddleware(BaseMiddleware):
+    """Keep cached admin statuses in sync with chat_member / my_chat_member updates"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, ChatMemberUpdated):
+            if event.new_chat_member.user.id == event.bot.id:
+                # Bot's own rights changed: cached answers may no longer be refreshable
+                invalidate_chat_admins(event.chat.id)
+            else:
+                update_admin_status(event.chat.id, event.new_chat_member.user.id, event.new_chat_member.status)
+
+        return await handler(event, data)
@@ -1,4 +1,4 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,20 +10,71 @@ from app.database.repositories.location import LocationRepository
 from app.database.repositories.game import GameRepository
 
 
+class LazySession:
+    """
+    Stand-in for AsyncSession that opens the real session on first use
+
+    Attribute access is forwarded to the session, which autobegins its
+    transaction (and checks out a pooled connection) on the first query.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = async_session_maker()
+        return getattr(self._session, name)
+
+    async def finish(self, commit: bool) -> None:
+        """Commit or roll back, and return the connection to the pool"""
+        if self._session is None:
+            return
+        try:
+            if commit:
+                await self._session.commit()
+            else:
+                await self._session.rollback()
+        finally:
+            await self._session.close()
+            self._session = None
+
+
 class DatabaseMiddleware(BaseMiddleware):
-    """Middleware to provide database session and repositories"""
-    
+    """
+    Middleware to provide database session and repositories
+
+    Each update is one unit of work: repositories only flush, and the
+    transaction is committed once after the handler returns, or rolled
+    back if it raises. The session is opened only when a repository is
+    first used, so updates that never touch the database (cached lookups,
+    /help, unmatched group messages) never check out a connection.
+
+    Handlers that keep sending after their last write commit explicitly
+    (``session.commit()``) before the sends, which returns the connection
+    to the pool while the sends wait on Telegram's rate limits; the final
+    commit then has nothing left to do.
+    """
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        async with async_session_maker() as session:
-            data["session"] = session
-            data["user_repo"] = UserRepository(session)
-            data["group_repo"] = GroupRepository(session)
-            data["location_repo"] = LocationRepository(session)
-            data["game_repo"] = GameRepository(session)
-            
-            return await handler(event, data)
+        session = LazySession()
+        data["session"] = session
+        data["user_repo"] = UserRepository(session)
+        data["group_repo"] = GroupRepository(session)
+        data["location_repo"] = LocationRepository(session)
+        data["game_repo"] = GameRepository(session)
+
+        try:
+            result = await handler(event, data)
+        except BaseException:
+            await session.finish(commit=False)
+            raise
+        await session.finish(commit=True)
+        return result
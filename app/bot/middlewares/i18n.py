@@ -1,39 +1,56 @@
 import json
+import string
 from pathlib import Path
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, User
 
 
+DEFAULT_LANGUAGE = "ru"
+
+
 class I18nMiddleware(BaseMiddleware):
     """Middleware for internationalization"""
     
     def __init__(self):
         self.translations = {}
+        # (lang, dotted key) -> (text, has placeholders)
+        self._catalog: dict[tuple[str, str], tuple[str, bool]] = {}
         self._load_translations()
     
     def _load_translations(self):
-        """Load all translation files"""
+        """Load all translation files and compile them into a flat catalog"""
         locales_dir = Path(__file__).parent.parent.parent / "locales"
         
         for locale_file in locales_dir.glob("*.json"):
             lang_code = locale_file.stem
             with open(locale_file, "r", encoding="utf-8") as f:
                 self.translations[lang_code] = json.load(f)
+
+        placeholders: dict[str, dict[str, frozenset[str]]] = {}
+        for lang_code, tree in self.translations.items():
+            placeholders[lang_code] = {}
+            for key, template in _flatten(tree):
+                fields = frozenset(
+                    field_name for _, field_name, _, _ in _formatter.parse(template) if field_name
+                )
+                placeholders[lang_code][key] = fields
+                # Templates without placeholders are stored ready to return
+                text = template if fields else template.format()
+                self._catalog[(lang_code, key)] = (text, bool(fields))
+
+        _validate_catalog(placeholders)
     
     def get_text(self, lang: str, key: str, **kwargs) -> str:
         """Get translated text by key"""
-        keys = key.split(".")
-        text = self.translations.get(lang, self.translations["ru"])
+        entry = self._catalog.get((lang, key)) or self._catalog.get((DEFAULT_LANGUAGE, key))
+        if entry is None:
+            return key
         
-        for k in keys:
-            text = text.get(k, key)
-            if isinstance(text, str):
-                break
-        
-        if isinstance(text, str) and kwargs:
+        text, has_placeholders = entry
+        if has_placeholders and kwargs:
             return text.format(**kwargs)
-        return text if isinstance(text, str) else key
+        return text
     
     async def __call__(
         self,
@@ -43,7 +60,7 @@ class I18nMiddleware(BaseMiddleware):
     ) -> Any:
         # Get user language from event
         user: User = data.get("event_from_user")
-        lang = "ru"  # default
+        lang = DEFAULT_LANGUAGE
         
         if user and user.language_code:
             # Map Telegram language codes to our codes
@@ -54,14 +71,50 @@ class I18nMiddleware(BaseMiddleware):
             elif user.language_code.startswith("az"):
                 lang = "az"
         
-        # Check if user has preferred language in database
+        # Check if user has preferred language in database (cached per user)
         user_repo = data.get("user_repo")
         if user_repo and user:
-            db_user = await user_repo.get_by_id(user.id)
-            if db_user:
-                lang = db_user.language
+            preferred = await user_repo.get_language(user.id)
+            if preferred:
+                lang = preferred
         
         data["lang"] = lang
         data["i18n"] = self
         
         return await handler(event, data)
+
+
+_formatter = string.Formatter()
+
+
+def _flatten(tree: dict, prefix: str = ""):
+    """Yield (dotted key, text) pairs of a nested translation dict"""
+    for name, value in tree.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{key}.")
+        else:
+            yield key, value
+
+
+def _validate_catalog(placeholders: dict[str, dict[str, frozenset[str]]]) -> None:
+    """Ensure every language defines the same keys with the same placeholders"""
+    reference = placeholders.get(DEFAULT_LANGUAGE)
+    if reference is None:
+        raise ValueError(f"Default locale '{DEFAULT_LANGUAGE}' is missing")
+
+    problems = []
+    for lang_code, fields_by_key in placeholders.items():
+        for key in reference.keys() - fields_by_key.keys():
+            problems.append(f"{lang_code}: missing key '{key}'")
+        for key in fields_by_key.keys() - reference.keys():
+            problems.append(f"{lang_code}: unknown key '{key}'")
+        for key in reference.keys() & fields_by_key.keys():
+            if fields_by_key[key] != reference[key]:
+                problems.append(
+                    f"{lang_code}: '{key}' has placeholders {sorted(fields_by_key[key])}, "
+                    f"expected {sorted(reference[key])}"
+                )
+
+    if problems:
+        raise ValueError("Inconsistent translations:\n" + "\n".join(problems))
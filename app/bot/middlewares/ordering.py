@@ -0,0 +1,95 @@
+import asyncio
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, TelegramObject
+
+from app.config import settings
+
+
+class _ChatLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # updates holding or waiting for the lock
+
+
+class ChatOrderingMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that serializes updates per chat
+
+    Polling and webhook mode both handle updates as concurrent tasks. Updates
+    from different chats run in parallel, while updates from one chat wait
+    for each other in arrival order (asyncio.Lock wakes waiters FIFO), so
+    read-modify-write sequences in handlers never interleave within a game.
+    Locks exist only while a chat has updates in flight.
+
+    ``max_concurrency`` additionally caps how many updates are handled at once;
+    a slot is taken only after the chat lock, so a busy chat cannot hold
+    more than one.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self._locks: dict[int, _ChatLock] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.handled = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        chat: Optional[Chat] = data.get("event_chat")
+        if chat is None:
+            return await self._handle(handler, event, data)
+
+        chat_lock = self._locks.get(chat.id)
+        if chat_lock is None:
+            chat_lock = self._locks[chat.id] = _ChatLock()
+        chat_lock.users += 1
+        try:
+            async with chat_lock.lock:
+                return await self._handle(handler, event, data)
+        finally:
+            chat_lock.users -= 1
+            if not chat_lock.users:
+                del self._locks[chat.id]
+
+    async def _handle(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if self._semaphore is None:
+            return await self._run(handler, event, data)
+        async with self._semaphore:
+            return await self._run(handler, event, data)
+
+    async def _run(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        self.active += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            self.handled += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Chats with updates in flight and handler counters"""
+        return {
+            "chats": len(self._locks),
+            "queued": sum(chat_lock.users - chat_lock.lock.locked() for chat_lock in self._locks.values()),
+            "active": self.active,
+            "handled": self.handled
+        }
+
+
+update_ordering = ChatOrderingMiddleware(max_concurrency=settings.UPDATE_CONCURRENCY)
@@ -0,0 +1,201 @@
+import asyncio
+import bisect
+import itertools
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Iterator, Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from app.bot.utils.rate_limit import ChatRateLimiter
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Outbound message priority, lower is sent first"""
+    HIGH = 0  # turn prompts and other messages the game waits on
+    NORMAL = 1  # regular replies
+    LOW = 2  # cosmetic edits
+
+
+_priority: ContextVar[Optional[Priority]] = ContextVar("outbound_priority", default=None)
+
+
+@contextmanager
+def outbound_priority(priority: Priority) -> Iterator[None]:
+    """Send messages within the block with the given priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@dataclass(order=True)
+class _Pending:
+    priority: int
+    seq: int
+    chat_id: Union[int, str] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Bot session middleware that every outgoing message goes through
+
+    Sends and edits wait for a token from their chat's bucket and the global
+    bucket; waiting requests are released in priority order. Requests that
+    hit RetryAfter pause their chat and are queued again.
+    """
+
+    def __init__(self, limiter: Optional[ChatRateLimiter] = None):
+        self.limiter = limiter or ChatRateLimiter()
+        self._pending: list[_Pending] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.max_depth = 0
+
+    @staticmethod
+    def is_rate_limited(method: TelegramMethod) -> bool:
+        """Whether the method posts or edits a chat message"""
+        name = method.__api_method__
+        return (
+            getattr(method, "chat_id", None) is not None
+            and name.startswith(("send", "edit", "copy", "forward"))
+        )
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not self.is_rate_limited(method):
+            return await make_request(bot, method)
+
+        priority = _priority.get()
+        if priority is None:
+            priority = Priority.LOW if method.__api_method__.startswith("edit") else Priority.NORMAL
+
+        for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+            await self._wait_turn(method.chat_id, priority)
+            try:
+                response = await make_request(bot, method)
+                self.sent += 1
+                return response
+            except TelegramRetryAfter as e:
+                self.limiter.pause_chat(method.chat_id, e.retry_after)
+                if attempt == settings.TELEGRAM_MAX_RETRIES:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                logger.warning(
+                    "Flood control for chat %s, retrying %s in %s s",
+                    method.chat_id, method.__api_method__, e.retry_after
+                )
+
+    async def _wait_turn(self, chat_id: Union[int, str], priority: Priority) -> None:
+        """Queue the request and wait until the dispatcher lets it through"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+        pending = _Pending(priority, next(self._seq), chat_id, loop.create_future())
+        bisect.insort(self._pending, pending)
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._wakeup.set()
+
+        try:
+            await pending.future
+        except asyncio.CancelledError:
+            if pending in self._pending:
+                self._pending.remove(pending)
+            raise
+
+    def _grant(self) -> Optional[float]:
+        """Release the first request that may be sent now, otherwise return seconds to wait"""
+        global_delay = self.limiter.global_bucket.delay()
+        if global_delay > 0:
+            return global_delay
+
+        min_delay = None
+        for index, pending in enumerate(self._pending):
+            if pending.future.done():
+                # Waiter was cancelled
+                del self._pending[index]
+                return 0.0
+
+            bucket = self.limiter.chat_bucket(pending.chat_id)
+            delay = bucket.delay()
+            if delay == 0:
+                bucket.try_acquire()
+                self.limiter.global_bucket.try_acquire()
+                del self._pending[index]
+                pending.future.set_result(None)
+                return None
+
+            min_delay = delay if min_delay is None else min(min_delay, delay)
+
+        return min_delay
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._grant()
+            if delay is None or delay == 0:
+                # Let the released request start before granting the next one
+                await asyncio.sleep(0)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth and delivery counters"""
+        depth = {priority.name.lower(): 0 for priority in Priority}
+        for pending in self._pending:
+            depth[Priority(pending.priority).name.lower()] += 1
+        return {
+            "queued": len(self._pending),
+            "queued_by_priority": depth,
+            "max_queued": self.max_depth,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failures": self.failures
+        }
+
+    async def close(self) -> None:
+        """Stop the dispatcher task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbound_scheduler = OutboundScheduler()
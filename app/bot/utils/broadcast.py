@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramBadRequest
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+async def send_safely(bot: Bot, chat_id: int, text: str, **kwargs) -> bool:
+    """Send a message, returns False if it couldn't be delivered"""
+    # Rate limiting and RetryAfter retries happen in the outbound scheduler
+    try:
+        await bot.send_message(chat_id, text, **kwargs)
+        return True
+    except (TelegramForbiddenError, TelegramBadRequest):
+        # Blocked the bot, never started it, or chat not found
+        return False
+    except TelegramAPIError as e:
+        logger.warning("Failed to send message to %s: %s", chat_id, e)
+        return False
+
+
+async def send_private_messages(bot: Bot, messages: list[tuple[int, str]]) -> list[int]:
+    """Send (chat ID, text) messages concurrently, returns chat IDs that could not be reached"""
+    semaphore = asyncio.Semaphore(settings.ROLE_SEND_CONCURRENCY)
+
+    async def send(chat_id: int, text: str) -> bool:
+        async with semaphore:
+            return await send_safely(bot, chat_id, text)
+
+    results = await asyncio.gather(*(send(chat_id, text) for chat_id, text in messages))
+    return [chat_id for (chat_id, _), delivered in zip(messages, results) if not delivered]
@@ -1,6 +1,8 @@
 import random
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
+from app.cache import LocationNames, normalize_name
 from app.database.models import Location
+from app.database.snapshots import PlayerSnapshot
 
 
 def select_spies(player_ids: List[int], spy_percentage: int) -> List[int]:
@@ -18,17 +20,11 @@ def shuffle_players(player_ids: List[int]) -> List[int]:
     return shuffled
 
 
-def select_random_location(locations: List[Location]) -> Location:
-    """Select random location from list"""
-    return random.choice(locations)
-
-
-def format_player_list(players: list, lang: str = "ru") -> str:
+def format_player_list(players: Sequence[PlayerSnapshot], lang: str = "ru") -> str:
     """Format player list for display"""
     lines = []
     for i, player in enumerate(players, 1):
-        name = player.user.first_name or player.user.username or f"User {player.user_id}"
-        lines.append(f"{i}. {name}")
+        lines.append(f"{i}. {player.display_name}")
     
     return "\n".join(lines)
 
@@ -36,3 +32,10 @@ def format_player_list(players: list, lang: str = "ru") -> str:
 def get_location_name(location: Location, lang: str) -> str:
     """Get location name in specified language"""
     return location.name_translations.get(lang, location.name_translations.get("ru", "Unknown"))
+
+
+def match_location(guess: str, indexes: Iterable[LocationNames], cutoff: float) -> Optional[Tuple[int, float]]:
+    """(location ID, similarity 0-100) of the location whose name is closest to the guess"""
+    normalized = normalize_name(guess)
+    matches = [match for index in indexes if (match := index.best_match(normalized, cutoff))]
+    return max(matches, key=lambda match: match[1], default=None)
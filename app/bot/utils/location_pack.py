@@ -0,0 +1,163 @@
+import csv
+import json
+from dataclasses import dataclass
+from pathlib import PurePath
+from typing import IO, Any, AsyncIterable, Iterable, Iterator, Optional
+
+from app.config import settings
+from app.database.repositories.location import LocationRepository
+
+
+LANGUAGES = ("ru", "en", "az")
+MAX_NAME_LENGTH = 100
+MAX_ALIASES = 20
+ALIAS_SEPARATOR = "|"  # between aliases in a CSV cell
+PACK_FORMATS = {".csv": "csv", ".json": "json", ".jsonl": "jsonl"}
+
+_JSON_SEPARATORS = " \t\r\n,[]"
+# Longest JSON value a usable row can take: every name and alias at full length
+# as \uXXXX escapes, plus keys and punctuation
+_MAX_JSON_VALUE_LENGTH = (len(LANGUAGES) + MAX_ALIASES) * MAX_NAME_LENGTH * 6 + 1024
+
+
+@dataclass
+class ImportResult:
+    added: int = 0
+    skipped: int = 0  # names that already exist
+    invalid: int = 0  # rows without a usable name
+
+
+def pack_format(filename: Optional[str]) -> Optional[str]:
+    """Pack format ("csv", "json" or "jsonl") from the file extension"""
+    if not filename:
+        return None
+    return PACK_FORMATS.get(PurePath(filename).suffix.lower())
+
+
+def parse_location(row: Any) -> Optional[tuple[dict, list[str]]]:
+    """(name translations, aliases) of a pack row, or None if it has no usable name"""
+    if not isinstance(row, dict):
+        return None
+
+    translations = {}
+    for lang in LANGUAGES:
+        name = row.get(lang)
+        if isinstance(name, str) and name.strip():
+            if len(name.strip()) > MAX_NAME_LENGTH:
+                return None
+            translations[lang] = name.strip()
+    if not translations:
+        return None
+
+    aliases = row.get("aliases") or []
+    if isinstance(aliases, str):
+        aliases = aliases.split(ALIAS_SEPARATOR)
+    aliases = [
+        alias.strip() for alias in aliases
+        if isinstance(alias, str) and alias.strip() and len(alias.strip()) <= MAX_NAME_LENGTH
+    ]
+    return translations, aliases[:MAX_ALIASES]
+
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[dict]:
+    """Rows of a CSV pack with a header line of language codes (and optionally "aliases")"""
+    reader = csv.DictReader(stream)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    yield from reader
+
+
+def iter_json_rows(stream: IO[str], chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Values of a top-level JSON array, or of JSON Lines
+
+    The stream is decoded chunk by chunk, so only the value being parsed
+    is held in memory, not the whole file. A value that is still incomplete
+    past the length of any usable row is treated as malformed right away.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in _JSON_SEPARATORS:
+            position += 1
+        if position < len(buffer):
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The value continues in the next chunk, unless there is none
+                if eof or len(buffer) - position > _MAX_JSON_VALUE_LENGTH:
+                    raise
+            else:
+                yield value
+                continue
+        elif eof:
+            return
+
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def read_pack(stream: IO[str], fmt: str) -> Iterator[Any]:
+    """Raw rows of a pack; ``stream`` should be opened with newline="" for CSV"""
+    return iter_csv_rows(stream) if fmt == "csv" else iter_json_rows(stream)
+
+
+async def import_locations(
+    location_repo: LocationRepository,
+    rows: Iterable[Any],
+    group_id: Optional[int] = None,
+    batch_size: int = settings.LOCATION_IMPORT_BATCH_SIZE
+) -> ImportResult:
+    """Insert pack rows in multi-row batches, skipping invalid rows and existing names"""
+    result = ImportResult()
+    batch: list[tuple[dict, list[str]]] = []
+
+    async def insert_batch() -> None:
+        added = await location_repo.bulk_create(batch, group_id)
+        result.added += added
+        result.skipped += len(batch) - added
+        batch.clear()
+
+    for row in rows:
+        location = parse_location(row)
+        if location is None:
+            result.invalid += 1
+            continue
+        batch.append(location)
+        if len(batch) >= batch_size:
+            await insert_batch()
+    if batch:
+        await insert_batch()
+    return result
+
+
+async def write_pack(stream: IO[str], fmt: str, locations: AsyncIterable[tuple[dict, list[str]]]) -> int:
+    """Write (name translations, aliases) rows in a format ``read_pack`` accepts, returns number of rows"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow([*LANGUAGES, "aliases"])
+        async for name_translations, aliases in locations:
+            writer.writerow([*(name_translations.get(lang, "") for lang in LANGUAGES), ALIAS_SEPARATOR.join(aliases)])
+            count += 1
+        return count
+
+    json_lines = fmt == "jsonl"
+    if not json_lines:
+        stream.write("[")
+    async for name_translations, aliases in locations:
+        row = dict(name_translations)
+        if aliases:
+            row["aliases"] = aliases
+        if json_lines:
+            stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            stream.write(("," if count else "") + "\n" + json.dumps(row, ensure_ascii=False))
+        count += 1
+    if not json_lines:
+        stream.write("\n]\n")
+    return count
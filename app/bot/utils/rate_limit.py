@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import Optional, Union
+
+from app.cache import TTLCache
+from app.config import settings
+
+
+class TokenBucket:
+    """Token bucket: ``rate`` tokens per second, up to ``capacity`` stored"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Hold back tokens for ``seconds`` (e.g. after Telegram asked to retry later)"""
+        self._refill()
+        self.tokens = min(self.tokens, 1) - seconds * self.rate
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available"""
+        if self.delay() > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        """Wait for a token and take it"""
+        while not self.try_acquire():
+            await asyncio.sleep(self.delay())
+
+
+# An idle bucket refills completely within a minute, so evicting it after that loses nothing
+CHAT_BUCKET_TTL = 60
+
+
+class ChatRateLimiter:
+    """Global bucket plus one bucket per chat, following Telegram's flood limits"""
+
+    def __init__(self, max_chats: int = 100_000, global_rate: Optional[float] = None):
+        global_rate = global_rate or settings.TELEGRAM_GLOBAL_RATE
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: TTLCache[Union[int, str], TokenBucket] = TTLCache(
+            max_chats, ttl=CHAT_BUCKET_TTL, name="chat_buckets"
+        )
+
+    def chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id, None)
+        if bucket is None:
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(settings.TELEGRAM_PRIVATE_CHAT_RATE, 1)
+            else:
+                bucket = TokenBucket(settings.TELEGRAM_GROUP_CHAT_RATE, settings.TELEGRAM_GROUP_CHAT_BURST)
+        # Refresh expiry on every use; a paused bucket is kept at least until the pause is over
+        self._chat_buckets.set(chat_id, bucket, ttl=max(CHAT_BUCKET_TTL, bucket.delay()))
+        return bucket
+
+    def pause_chat(self, chat_id: Union[int, str], seconds: float) -> None:
+        """Hold back the chat's messages for ``seconds`` (after Telegram asked to retry later)"""
+        bucket = self.chat_bucket(chat_id)
+        bucket.pause(seconds)
+        self._chat_buckets.set(chat_id, bucket, ttl=max(CHAT_BUCKET_TTL, bucket.delay()))
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from aiogram import Bot
+
+from app.bot.middlewares.i18n import I18nMiddleware, DEFAULT_LANGUAGE
+from app.bot.middlewares.outbound import outbound_priority, Priority
+from app.bot.utils.broadcast import send_safely
+from app.config import settings
+from app.database.database import async_session_maker
+from app.database.repositories.game import GameRepository
+
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("app.metrics")
+
+
+class GameReaper:
+    """
+    Closes games nobody has touched for a long time
+
+    Games of groups that went quiet or removed the bot would otherwise
+    stay active forever and block /startgame there. Each cycle closes the
+    oldest idle games in batches, one short transaction per batch, and
+    stops after ``max_per_cycle`` so a large backlog is worked off over
+    several cycles instead of in one long burst.
+    """
+
+    def __init__(self, idle_timeout: int, batch_size: int, max_per_cycle: int, notify: bool):
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size
+        self.max_per_cycle = max_per_cycle
+        self.notify = notify
+        self._task: Optional[asyncio.Task] = None
+        self.bot: Optional[Bot] = None
+        self.i18n: Optional[I18nMiddleware] = None
+        self.cycles = 0
+        self.closed = 0
+
+    def start(self, bot: Bot, i18n: I18nMiddleware, interval: int) -> None:
+        """Run a cycle every ``interval`` seconds"""
+        self.bot = bot
+        self.i18n = i18n
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def _run(self, interval: int) -> None:
+        while True:
+            try:
+                await self.run_cycle()
+            except Exception:
+                logger.exception("Failed to close stale games")
+            await asyncio.sleep(interval)
+
+    async def run_cycle(self) -> int:
+        """Close games idle longer than ``idle_timeout`` seconds, returns how many were closed"""
+        started = time.perf_counter()
+        idle_before = datetime.utcnow() - timedelta(seconds=self.idle_timeout)
+        closed: list[tuple[int, int, str]] = []
+
+        while len(closed) < self.max_per_cycle:
+            limit = min(self.batch_size, self.max_per_cycle - len(closed))
+            async with async_session_maker() as session, session.begin():
+                batch = await GameRepository(session).close_stale_games(idle_before, limit)
+            closed.extend(batch)
+            if len(batch) < limit:
+                break
+
+        self.cycles += 1
+        self.closed += len(closed)
+        metrics_logger.info(
+            "Reaper: closed %s stale games in %.0f ms", len(closed), (time.perf_counter() - started) * 1000
+        )
+
+        if closed and self.notify:
+            await self._notify(closed)
+        return len(closed)
+
+    async def _notify(self, closed: list[tuple[int, int, str]]) -> None:
+        messages = [
+            (group_id, self.i18n.get_text(language or DEFAULT_LANGUAGE, "game.expired"))
+            for _, group_id, language in closed
+        ]
+
+        # The outbound scheduler paces these behind the bot's regular traffic
+        with outbound_priority(Priority.LOW):
+            await asyncio.gather(*(send_safely(self.bot, chat_id, text) for chat_id, text in messages))
+
+    def stats(self) -> dict[str, Any]:
+        """Completed cycles and games closed so far"""
+        return {
+            "cycles": self.cycles,
+            "closed": self.closed
+        }
+
+    async def stop(self) -> None:
+        """Stop the reaper task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+game_reaper = GameReaper(
+    idle_timeout=settings.REAPER_IDLE_TIMEOUT,
+    batch_size=settings.REAPER_BATCH_SIZE,
+    max_per_cycle=settings.REAPER_MAX_PER_CYCLE,
+    notify=settings.REAPER_NOTIFY
+)
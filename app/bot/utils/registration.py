@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import InlineKeyboardMarkup
+
+from app.bot.middlewares.i18n import I18nMiddleware
+from app.cache import TTLCache
+from app.bot.utils.game_logic import format_player_list
+from app.config import settings
+from app.database.database import async_session_maker
+from app.database.models import GameStatus
+from app.database.repositories.game import GameRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingEdit:
+    bot: Bot
+    i18n: I18nMiddleware
+    message_id: int
+    game_id: int
+    lang: str
+    base_text: str
+    reply_markup: Optional[InlineKeyboardMarkup]
+
+
+class RegistrationMessageUpdater:
+    """
+    Coalesces registration message edits per chat
+
+    Joins within ``delay`` seconds of each other produce a single edit that
+    renders the roster as it is when the window closes.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._pending: dict[int, _PendingEdit] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        # (chat ID, message ID) -> last rendered text, to skip no-op edits
+        self._rendered: TTLCache[tuple[int, int], str] = TTLCache(maxsize=10000, ttl=3600, name="registration_messages")
+
+    def schedule(
+        self,
+        bot: Bot,
+        i18n: I18nMiddleware,
+        chat_id: int,
+        message_id: int,
+        game_id: int,
+        lang: str,
+        base_text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None
+    ) -> None:
+        """Request a roster refresh of the registration message"""
+        self._pending[chat_id] = _PendingEdit(bot, i18n, message_id, game_id, lang, base_text, reply_markup)
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    async def _flush_later(self, chat_id: int) -> None:
+        await asyncio.sleep(self.delay)
+        edit = self._pending.pop(chat_id)
+        try:
+            await self._render(chat_id, edit)
+        except Exception:
+            logger.exception("Failed to update registration message in chat %s", chat_id)
+        finally:
+            del self._tasks[chat_id]
+            # Joins that arrived while rendering get their own window
+            if chat_id in self._pending:
+                self._tasks[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    async def _render(self, chat_id: int, edit: _PendingEdit) -> None:
+        async with async_session_maker() as session:
+            game = await GameRepository(session).get_snapshot(edit.game_id)
+
+        if not game or game.status != GameStatus.REGISTRATION:
+            self._rendered.invalidate((chat_id, edit.message_id))
+            return
+
+        players_text = format_player_list(game.players, edit.lang)
+        status_text = edit.i18n.get_text(
+            edit.lang,
+            "game.players_list",
+            count=len(game.players),
+            players=players_text
+        )
+        text = edit.base_text + "\n\n" + status_text
+
+        key = (chat_id, edit.message_id)
+        if self._rendered.get(key) == text:
+            return
+
+        try:
+            await edit.bot.edit_message_text(
+                text=text,
+                chat_id=chat_id,
+                message_id=edit.message_id,
+                reply_markup=edit.reply_markup
+            )
+            self._rendered.set(key, text)
+        except TelegramAPIError as e:
+            logger.debug("Registration message edit failed in chat %s: %s", chat_id, e)
+
+
+registration_updater = RegistrationMessageUpdater(delay=settings.REGISTRATION_EDIT_DELAY)
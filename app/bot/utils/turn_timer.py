@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from app.bot.middlewares.i18n import I18nMiddleware, DEFAULT_LANGUAGE
+from app.bot.middlewares.outbound import outbound_priority, Priority
+from app.cache import active_game_index
+from app.database.database import async_session_maker
+from app.database.models import Game, GameStatus
+from app.database.repositories.game import GameRepository
+from app.database.repositories.group import GroupRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+async def send_turn_prompt(bot: Bot, chat_id: int, user_id: int, name: str, lang: str, i18n: I18nMiddleware):
+    """Announce the next player and mention them (sent ahead of other queued messages)"""
+    text = i18n.get_text(lang, "game.next_player", name=name)
+
+    with outbound_priority(Priority.HIGH):
+        try:
+            await bot.send_message(chat_id, text)
+            # Try to mention user
+            await bot.send_message(
+                chat_id,
+                f"<a href='tg://user?id={user_id}'>{name}</a> " +
+                i18n.get_text(lang, "game.your_turn"),
+                parse_mode="HTML"
+            )
+        except TelegramBadRequest:
+            await bot.send_message(chat_id, text)
+
+
+@dataclass(order=True)
+class _Deadline:
+    at: datetime  # naive UTC, like Game.turn_deadline
+    game_id: int = field(compare=False)
+    chat_id: int = field(compare=False)
+    user_id: int = field(compare=False)
+
+
+class TurnTimer:
+    """
+    Skips turns that ran past their deadline
+
+    All games share one heap and one task that sleeps until the earliest
+    deadline, so tracking a game costs a heap entry rather than a sleeping
+    task. When a turn changes, the new deadline is pushed and the old entry
+    is left in the heap and ignored when it comes up. Deadlines live in
+    ``games.turn_deadline`` and are restored from there at startup.
+    """
+
+    def __init__(self, max_concurrent_skips: int = 10):
+        self._heap: list[_Deadline] = []
+        self._current: dict[int, _Deadline] = {}  # game ID -> its live deadline
+        self._limit = asyncio.Semaphore(max_concurrent_skips)
+        self._tasks: set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.bot: Optional[Bot] = None
+        self.i18n: Optional[I18nMiddleware] = None
+        self.skipped = 0
+
+    def start(
+        self,
+        bot: Bot,
+        i18n: I18nMiddleware,
+        deadlines: Iterable[tuple[int, int, datetime, Optional[list[int]], int]] = ()
+    ) -> None:
+        """Start the timer task with (game ID, chat ID, deadline, player order, current index) rows"""
+        self.bot = bot
+        self.i18n = i18n
+        for game_id, chat_id, deadline, player_order, current_player_index in deadlines:
+            self._push(game_id, chat_id, deadline, player_order, current_player_index)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Turn timer started with %s pending deadlines", len(self._current))
+
+    def track(self, game: Game) -> None:
+        """Follow the game's current turn deadline, or stop following an untimed game"""
+        if game.status != GameStatus.IN_PROGRESS or game.turn_deadline is None:
+            self._current.pop(game.id, None)
+            return
+        self._push(game.id, game.group_id, game.turn_deadline, game.player_order, game.current_player_index)
+
+    def _push(
+        self,
+        game_id: int,
+        chat_id: int,
+        deadline: datetime,
+        player_order: Optional[list[int]],
+        current_player_index: int
+    ) -> None:
+        if not player_order:
+            self._current.pop(game_id, None)
+            return
+        user_id = player_order[current_player_index % len(player_order)]
+        entry = _Deadline(deadline, game_id, chat_id, user_id)
+        self._current[game_id] = entry
+        heapq.heappush(self._heap, entry)
+        if self._wakeup and self._heap[0] is entry:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.utcnow()
+            while self._heap and self._heap[0].at <= now:
+                entry = heapq.heappop(self._heap)
+                if self._current.get(entry.game_id) is not entry:
+                    # The turn moved on (or the game ended) after this deadline was set
+                    continue
+                del self._current[entry.game_id]
+                task = asyncio.create_task(self._expire(entry))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            timeout = (self._heap[0].at - now).total_seconds() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, entry: _Deadline) -> None:
+        # Cheap check first: the game may have ended or the turn moved in this process
+        turn = active_game_index.get(entry.chat_id)
+        if not turn or turn.game_id != entry.game_id or turn.current_user_id != entry.user_id:
+            return
+
+        async with self._limit:
+            try:
+                async with async_session_maker() as session, session.begin():
+                    group = await GroupRepository(session).get_settings(entry.chat_id)
+                    game_repo = GameRepository(session)
+                    turn_timeout = group.turn_timeout if group else 0
+                    game = await game_repo.skip_turn(entry.game_id, entry.user_id, turn_timeout)
+                    if not game:
+                        return
+                    snapshot = await game_repo.get_snapshot(game.id)
+
+                self.track(game)
+                self.skipped += 1
+
+                lang = group.language if group else DEFAULT_LANGUAGE
+                next_user_id = game.player_order[game.current_player_index]
+                await self.bot.send_message(
+                    entry.chat_id,
+                    self.i18n.get_text(lang, "game.turn_timeout", name=snapshot.player_name(entry.user_id))
+                )
+                await send_turn_prompt(
+                    self.bot, entry.chat_id, next_user_id, snapshot.player_name(next_user_id), lang, self.i18n
+                )
+            except TelegramForbiddenError:
+                # The bot was removed from the group; stop timing the game and leave it to the reaper
+                self._current.pop(entry.game_id, None)
+                logger.info("Stopped timing game %s: bot can't write to chat %s", entry.game_id, entry.chat_id)
+            except Exception:
+                logger.exception("Failed to skip turn in game %s", entry.game_id)
+
+    def stats(self) -> dict[str, Any]:
+        """Tracked games, heap size (including superseded entries) and skipped turns"""
+        return {
+            "games": len(self._current),
+            "heap": len(self._heap),
+            "skipped": self.skipped
+        }
+
+    async def stop(self) -> None:
+        """Stop the timer task; pending deadlines stay in the database"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+turn_timer = TurnTimer()
@@ -0,0 +1,241 @@
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from rapidfuzz import fuzz, process
+
+from app.config import settings
+from app.database.snapshots import GroupSettings
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+MISSING: Any = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded in-process LRU cache with per-entry expiry
+
+    Not thread-safe; meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K, default: Any = MISSING) -> V:
+        """Get cached value, or ``default`` if absent or expired"""
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+
+        self.misses += 1
+        return default
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """Store value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        """Drop cached value"""
+        self._data.pop(key, None)
+
+    def invalidate_if(self, predicate: Callable[[K], bool]) -> int:
+        """Drop all entries whose key matches, returns number of dropped entries"""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ActiveTurn:
+    game_id: int
+    current_user_id: int
+
+
+class ActiveGameIndex:
+    """
+    Chat ID -> game in progress and whose turn it is
+
+    Kept in step by GameRepository (start, next, end, resume) and rebuilt
+    from the database at startup, so handlers can drop messages for chats
+    without a game in progress before doing any I/O. The database stays
+    authoritative: a match here is re-checked by the query that acts on it.
+    """
+
+    name = "active_games"
+
+    def __init__(self):
+        self._turns: dict[int, ActiveTurn] = {}
+
+    def get(self, chat_id: int) -> Optional[ActiveTurn]:
+        return self._turns.get(chat_id)
+
+    def set_turn(
+        self,
+        chat_id: int,
+        game_id: int,
+        player_order: Optional[list[int]],
+        current_player_index: int
+    ) -> None:
+        """Record current player of a game in progress"""
+        if not player_order:
+            self._turns.pop(chat_id, None)
+            return
+        current_user_id = player_order[current_player_index % len(player_order)]
+        self._turns[chat_id] = ActiveTurn(game_id, current_user_id)
+
+    def discard(self, chat_id: int) -> None:
+        self._turns.pop(chat_id, None)
+
+    invalidate = discard  # same interface as TTLCache for invalidate_shared
+
+    def rebuild(self, games: Iterable[tuple[int, int, Optional[list[int]], int]]) -> None:
+        """Replace contents with (chat ID, game ID, player order, current index) rows"""
+        self._turns.clear()
+        for chat_id, game_id, player_order, current_player_index in games:
+            self.set_turn(chat_id, game_id, player_order, current_player_index)
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and collapse whitespace, for comparing location names"""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(folded.split())
+
+
+@dataclass(frozen=True, slots=True)
+class LocationNames:
+    """Normalized names of locations in every language, plus aliases, for fuzzy matching"""
+    names: tuple[str, ...]
+    location_ids: tuple[int, ...]  # location of each name
+
+    @classmethod
+    def build(cls, locations: Iterable[tuple[int, dict, Optional[list]]]) -> "LocationNames":
+        """Build from (location ID, name translations, aliases) rows"""
+        names: list[str] = []
+        location_ids: list[int] = []
+        for location_id, name_translations, aliases in locations:
+            unique = {normalize_name(name) for name in (*name_translations.values(), *(aliases or ())) if name}
+            unique.discard("")
+            names.extend(unique)
+            location_ids.extend([location_id] * len(unique))
+        return cls(tuple(names), tuple(location_ids))
+
+    def best_match(self, guess: str, cutoff: float) -> Optional[tuple[int, float]]:
+        """(location ID, score 0-100) of the name closest to a normalized guess, if it scores at least ``cutoff``"""
+        match = process.extractOne(guess, self.names, scorer=fuzz.ratio, processor=None, score_cutoff=cutoff)
+        if match is None:
+            return None
+        _, score, position = match
+        return self.location_ids[position], score
+
+
+# User ID -> preferred language, or None for users that are not registered
+user_language_cache: TTLCache[int, Optional[str]] = TTLCache(
+    maxsize=settings.USER_LANGUAGE_CACHE_SIZE,
+    ttl=settings.USER_LANGUAGE_CACHE_TTL,
+    name="user_language"
+)
+
+# Group ID -> GroupSettings snapshot (write-through from GroupRepository)
+group_settings_cache: TTLCache[int, GroupSettings] = TTLCache(
+    maxsize=settings.GROUP_CACHE_SIZE,
+    ttl=settings.GROUP_CACHE_TTL,
+    name="group_settings"
+)
+
+# (chat ID, user ID) -> whether the user is a chat administrator
+admin_status_cache: TTLCache[tuple[int, int], bool] = TTLCache(
+    maxsize=settings.ADMIN_CACHE_SIZE,
+    ttl=settings.ADMIN_CACHE_TTL,
+    name="admin_status"
+)
+
+# Chat ID -> IDs of all chat administrators (from get_chat_administrators)
+chat_admins_cache: TTLCache[int, frozenset[int]] = TTLCache(
+    maxsize=settings.ADMIN_CACHE_SIZE,
+    ttl=settings.ADMIN_CACHE_TTL,
+    name="chat_admins"
+)
+
+# Group ID (None for default locations) -> names of its active locations
+location_names_cache: TTLCache[Optional[int], LocationNames] = TTLCache(
+    maxsize=settings.LOCATION_INDEX_CACHE_SIZE,
+    ttl=settings.LOCATION_INDEX_CACHE_TTL,
+    name="location_names"
+)
+
+# Group chats with a game in progress
+active_game_index = ActiveGameIndex()
+
+
+# Caches whose entries other worker processes may hold too, by name
+_shared_caches: dict[str, Any] = {
+    cache.name: cache for cache in (user_language_cache, location_names_cache, active_game_index)
+}
+
+# Passes (cache name, key) invalidations on to the other workers, set in sharded mode
+_invalidation_publisher: Optional[Callable[[str, Any], None]] = None
+
+
+def set_invalidation_publisher(publisher: Optional[Callable[[str, Any], None]]) -> None:
+    global _invalidation_publisher
+    _invalidation_publisher = publisher
+
+
+def invalidate_shared(cache: Any, key: Any) -> None:
+    """Drop an entry of a shared cache in this process and, in sharded mode, in every other worker"""
+    cache.invalidate(key)
+    if _invalidation_publisher is not None:
+        _invalidation_publisher(cache.name, key)
+
+
+def apply_invalidation(name: str, key: Any) -> None:
+    """Drop an entry invalidated by another worker"""
+    _shared_caches[name].invalidate(key)
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Stats of all shared caches"""
+    caches = (user_language_cache, group_settings_cache, admin_status_cache, chat_admins_cache, location_names_cache)
+    stats = {cache.name: cache.stats() for cache in caches}
+    stats["active_games"] = {"size": len(active_game_index)}
+    return stats
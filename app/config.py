@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from urllib.parse import quote_plus
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,9 +15,73 @@ class Settings(BaseSettings):
     DB_NAME: str = "spy_game"
     DB_USER: str = "postgres"
     DB_PASSWORD: str
+
+    # Database connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to disable
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WAIT_WARNING_MS: int = 100  # log checkouts that waited longer than this
+    DB_STATEMENT_CACHE_SIZE: int = 500  # asyncpg prepared statements per connection, 0 to disable
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: Optional[int] = None
+    DB_APPLICATION_NAME: str = "spy-game-bot"
+    DB_ECHO: bool = False  # log every SQL statement
     
+    # In-process caches
+    USER_LANGUAGE_CACHE_SIZE: int = 50000
+    USER_LANGUAGE_CACHE_TTL: int = 600  # seconds
+    GROUP_CACHE_SIZE: int = 20000
+    GROUP_CACHE_TTL: int = 3600  # seconds
+    ADMIN_CACHE_SIZE: int = 50000
+    ADMIN_CACHE_TTL: int = 120  # seconds
+    ADMIN_CACHE_PREFILL: bool = True  # load all chat admins with one get_chat_administrators call
+    LOCATION_INDEX_CACHE_SIZE: int = 5000  # groups whose location names are kept for /guess
+    LOCATION_INDEX_CACHE_TTL: int = 3600  # seconds
+
+    # Telegram outbound limits
+    TELEGRAM_GLOBAL_RATE: float = 30.0  # messages per second across all chats
+    TELEGRAM_PRIVATE_CHAT_RATE: float = 1.0  # messages per second to one private chat
+    TELEGRAM_GROUP_CHAT_RATE: float = 20 / 60  # messages per second to one group
+    TELEGRAM_GROUP_CHAT_BURST: int = 5
+    TELEGRAM_MAX_RETRIES: int = 3  # retries after RetryAfter
+    ROLE_SEND_CONCURRENCY: int = 8
+    REGISTRATION_EDIT_DELAY: float = 1.5  # seconds to coalesce join updates of the registration message
+
+    # Update delivery
+    RUN_MODE: Literal["polling", "webhook"] = "polling"
+    WEBHOOK_BASE_URL: Optional[str] = None  # public HTTPS URL Telegram posts updates to
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: Optional[str] = None  # checked against X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_DROP_PENDING_UPDATES: bool = False
+    WEBHOOK_DELETE_ON_SHUTDOWN: bool = True  # disable when several replicas share the webhook
+    UPDATE_CONCURRENCY: int = 200  # updates handled at once across chats, 0 for no limit
+    POLLING_TIMEOUT: int = 30  # seconds, long polling timeout
+
+    # Worker processes (updates are routed to workers by chat)
+    WORKERS: int = 1  # more than 1 starts a supervisor with this many worker processes
+    WORKER_HEARTBEAT_INTERVAL: float = 5.0  # seconds
+    WORKER_HEARTBEAT_TIMEOUT: float = 60.0  # seconds without heartbeat before a worker is restarted
+    WORKER_EVENT_RELAY_INTERVAL: float = 0.2  # seconds between passing cache invalidations on to other workers
+
+    # Closing abandoned games
+    REAPER_INTERVAL: int = 600  # seconds between cycles, 0 to disable
+    REAPER_IDLE_TIMEOUT: int = 6 * 3600  # seconds without changes before an active game is closed
+    REAPER_BATCH_SIZE: int = 100  # games closed per UPDATE
+    REAPER_MAX_PER_CYCLE: int = 1000
+    REAPER_NOTIFY: bool = True  # tell the group its game was closed
+
+    # Games
+    LOCATION_REPEAT_WINDOW: int = 5  # skip locations of the group's last N games when picking one, 0 to allow repeats
+    LOCATION_IMPORT_BATCH_SIZE: int = 500  # locations per INSERT when importing a pack
+    LOCATION_IMPORT_MAX_SIZE: int = 5 * 1024 * 1024  # bytes, largest pack file accepted in chat
+
     # App
     DEBUG: bool = False
+    METRICS_INTERVAL: int = 300  # seconds between metrics log lines, 0 to disable
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -31,5 +96,22 @@ class Settings(BaseSettings):
         encoded_password = quote_plus(self.DB_PASSWORD)
         return f"postgresql+asyncpg://{self.DB_USER}:{encoded_password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def database_server_settings(self) -> dict[str, str]:
+        """PostgreSQL session parameters sent on connect"""
+        server_settings = {"application_name": self.DB_APPLICATION_NAME}
+        if self.DB_STATEMENT_TIMEOUT_MS is not None:
+            server_settings["statement_timeout"] = str(self.DB_STATEMENT_TIMEOUT_MS)
+        if self.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS is not None:
+            server_settings["idle_in_transaction_session_timeout"] = str(self.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS)
+        return server_settings
+
+    @property
+    def webhook_url(self) -> str:
+        """Full webhook URL registered with Telegram"""
+        if not self.WEBHOOK_BASE_URL:
+            raise ValueError("WEBHOOK_BASE_URL is required when RUN_MODE=webhook")
+        return self.WEBHOOK_BASE_URL.rstrip("/") + self.WEBHOOK_PATH
+
 
 settings = Settings()
@@ -1,21 +1,109 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import AsyncGenerator, Any, Callable
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from app.config import settings
 
 
+logger = logging.getLogger(__name__)
+
+
 class Base(DeclarativeBase):
     """Base class for all models"""
     pass
 
 
+@dataclass
+class PoolStats:
+    """Connection pool checkout counters"""
+    checkouts: int = 0
+    pending: int = 0  # checkouts currently waiting for (or opening) a connection
+    slow_checkouts: int = 0
+    timeouts: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    saturated: bool = False
+
+
+pool_stats = PoolStats()
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection"""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        pool_stats.pending += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            logger.error(
+                "Timed out waiting for a database connection (%d pending, %s)",
+                pool_stats.pending, self.status()
+            )
+            raise
+        finally:
+            waited_ms = (time.perf_counter() - start) * 1000
+            pool_stats.pending -= 1
+            pool_stats.checkouts += 1
+            pool_stats.total_wait_ms += waited_ms
+            pool_stats.max_wait_ms = max(pool_stats.max_wait_ms, waited_ms)
+
+            if waited_ms >= settings.DB_POOL_WAIT_WARNING_MS:
+                pool_stats.slow_checkouts += 1
+                logger.warning(
+                    "Waited %.0f ms for a database connection (%d pending, %s)",
+                    waited_ms, pool_stats.pending, self.status()
+                )
+
+            saturated = self.checkedout() >= self.size() + max(self._max_overflow, 0)
+            if saturated != pool_stats.saturated:
+                pool_stats.saturated = saturated
+                if saturated:
+                    logger.warning("Database connection pool is saturated (%s)", self.status())
+                else:
+                    logger.info("Database connection pool recovered (%s)", self.status())
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Current pool usage and checkout counters"""
+    pool = engine.pool
+    stats = asdict(pool_stats)
+    stats.update(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+        avg_wait_ms=pool_stats.total_wait_ms / pool_stats.checkouts if pool_stats.checkouts else 0.0
+    )
+    return stats
+
+
+def _create_engine(pool_size: int, max_overflow: int) -> AsyncEngine:
+    return create_async_engine(
+        settings.database_url,
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=MonitoredQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": settings.database_server_settings
+        }
+    )
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.DEBUG,
-    future=True
-)
+engine = _create_engine(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
 
 # Create session factory
 async_session_maker = async_sessionmaker(
@@ -25,6 +113,34 @@ async_session_maker = async_sessionmaker(
 )
 
 
+def resize_pool(pool_size: int, max_overflow: int) -> None:
+    """Use a connection pool of a different size; call before the first query"""
+    global engine
+    engine = _create_engine(pool_size, max_overflow)
+    async_session_maker.configure(bind=engine)
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """
+    Run ``callback`` after the session's transaction commits
+
+    Used for in-process caches, so a change that is rolled back never
+    reaches them. Callbacks of a rolled back transaction are dropped.
+    """
+    session.info.setdefault("on_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    for callback in session.info.pop("on_commit", ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_commit(session: Session) -> None:
+    session.info.pop("on_commit", None)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session"""
     async with async_session_maker() as session:
@@ -32,11 +148,11 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def init_db():
-    """Initialize database"""
-    async with engine.begin() as conn:
-        # Import all models here to ensure they are registered
-        from app.database.models import User, Group, Location, Game, GamePlayer
-        await conn.run_sync(Base.metadata.create_all)
+    """Check that the database schema exists; it is created by the Alembic migrations only"""
+    async with engine.connect() as conn:
+        migrated = await conn.scalar(text("SELECT to_regclass('alembic_version') IS NOT NULL"))
+    if not migrated:
+        raise RuntimeError("Database schema is missing, run `alembic upgrade head` first")
 
 
 async def close_db():
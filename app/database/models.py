@@ -1,7 +1,9 @@
 from datetime import datetime
 from enum import Enum as PyEnum
 from typing import Optional
-from sqlalchemy import String, BigInteger, Integer, Boolean, DateTime, JSON, ForeignKey, Enum, Text
+from sqlalchemy import (
+    String, BigInteger, Integer, Boolean, DateTime, JSON, ForeignKey, Enum, Text, Index, UniqueConstraint, func, text
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database.database import Base
@@ -41,6 +43,8 @@ class Group(Base):
     min_players: Mapped[int] = mapped_column(Integer, default=4)
     max_players: Mapped[int] = mapped_column(Integer, default=10)
     spy_percentage: Mapped[int] = mapped_column(Integer, default=20)
+    # Seconds per turn, 0 for no limit
+    turn_timeout: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -53,11 +57,19 @@ class Group(Base):
 class Location(Base):
     """Location model"""
     __tablename__ = "locations"
+    __table_args__ = (
+        # LocationRepository.get_all_for_group / get_default_locations
+        Index("ix_locations_group_id_is_active", "group_id", "is_active"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     # Translations stored as JSON: {"ru": "Больница", "en": "Hospital", "az": "Xəstəxana"}
     name_translations: Mapped[dict] = mapped_column(JSON)
+    # Other accepted spellings for /guess, in any language
+    aliases: Mapped[list] = mapped_column(JSON, default=list, server_default="[]")
+    # Hash of the normalized primary name, see repositories.location.location_name_hash
+    name_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
 
     # If group_id is NULL, it's a default location for all groups
     group_id: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey("groups.id", ondelete="CASCADE"), nullable=True)
@@ -70,9 +82,40 @@ class Location(Base):
     games: Mapped[list["Game"]] = relationship(back_populates="location")
 
 
+# Location names are unique among a group's active locations, and among default ones;
+# imports skip duplicates with ON CONFLICT DO NOTHING against this index
+Index(
+    "uq_locations_scope_name_hash",
+    func.coalesce(Location.group_id, 0),
+    Location.name_hash,
+    unique=True,
+    postgresql_where=text("is_active AND name_hash IS NOT NULL"),
+)
+
+
 class Game(Base):
     """Game session model"""
     __tablename__ = "games"
+    __table_args__ = (
+        # GameRepository.get_active_game_for_group: at most a handful of rows per group are active.
+        # The enum is stored by member name, hence the upper-case literals.
+        Index(
+            "ix_games_active_group_id",
+            "group_id",
+            postgresql_where=text("status IN ('REGISTRATION', 'IN_PROGRESS')"),
+        ),
+        # LocationRepository.pick_random_for_group: locations of a group's latest games
+        Index("ix_games_group_id_id", "group_id", "id"),
+        # TurnTimer restores pending deadlines at startup; only timed turns are indexed
+        Index(
+            "ix_games_turn_deadline",
+            "turn_deadline",
+            postgresql_where=text("turn_deadline IS NOT NULL"),
+        ),
+        # GameReaper: oldest untouched active games first. Deliberately not partial on the active
+        # statuses, so the planner can't pick it over ix_games_active_group_id for group lookups
+        Index("ix_games_status_updated_at", "status", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("groups.id", ondelete="CASCADE"))
@@ -83,21 +126,29 @@ class Game(Base):
     # Game state
     current_player_index: Mapped[int] = mapped_column(Integer, default=0)
     player_order: Mapped[list] = mapped_column(JSON, default=list)  # List of user IDs in turn order
-    votes: Mapped[dict] = mapped_column(JSON, default=dict)  # Dict of {voter_id: voted_for_id}
+    # When the current turn is skipped
+    turn_deadline: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Last change of the game row (start, turn moves, end); UPDATE statements set it too
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     group: Mapped["Group"] = relationship(back_populates="games")
     location: Mapped[Optional["Location"]] = relationship(back_populates="games")
     players: Mapped[list["GamePlayer"]] = relationship(back_populates="game", cascade="all, delete-orphan")
+    votes: Mapped[list["GameVote"]] = relationship(cascade="all, delete-orphan", passive_deletes=True)
 
 
 class GamePlayer(Base):
     """Game player model (many-to-many with additional fields)"""
     __tablename__ = "game_players"
+    __table_args__ = (
+        # One row per player per game; also serves add_player / eliminate_player lookups
+        UniqueConstraint("game_id", "user_id", name="uq_game_players_game_id_user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     game_id: Mapped[int] = mapped_column(Integer, ForeignKey("games.id", ondelete="CASCADE"))
@@ -110,3 +161,13 @@ class GamePlayer(Base):
     # Relationships
     game: Mapped["Game"] = relationship(back_populates="players")
     user: Mapped["User"] = relationship(back_populates="game_players")
+
+
+class GameVote(Base):
+    """Game vote model (one current vote per voter per game)"""
+    __tablename__ = "game_votes"
+
+    game_id: Mapped[int] = mapped_column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    voter_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    target_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"))
+    voted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,44 @@
+from dataclasses import dataclass
 from typing import Optional
-from datetime import datetime
-from sqlalchemy import select, and_
+from datetime import datetime, timedelta
+from sqlalchemy import (
+    select, update, delete, exists, and_, func, literal, cast, Integer, BigInteger, Text, ColumnElement
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import Game, GamePlayer, GameStatus
+from app.cache import active_game_index, invalidate_shared
+from app.database.database import on_commit
+from app.database.models import Game, GamePlayer, GameStatus, GameVote, Group, User
+from app.database.snapshots import GameSnapshot, PlayerSnapshot
+
+
+def _turn_deadline(turn_timeout: int) -> Optional[datetime]:
+    return datetime.utcnow() + timedelta(seconds=turn_timeout) if turn_timeout > 0 else None
+
+
+@dataclass(frozen=True)
+class VoteTally:
+    """Vote counts for a game, most voted first"""
+    counts: list[tuple[int, int]]  # (target user ID, votes)
+    total_votes: int
+    total_players: int
+
+    @property
+    def all_voted(self) -> bool:
+        return self.total_players > 0 and self.total_votes >= self.total_players
+
+
+@dataclass(frozen=True)
+class TurnMove:
+    """Game whose turn moved, with the name of the player whose turn it is now"""
+    game: Game
+    player_name: str
+
+    @property
+    def current_user_id(self) -> int:
+        return self.game.player_order[self.game.current_player_index]
 
 
 class GameRepository:
@@ -36,6 +70,86 @@ class GameRepository:
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_snapshot(self, game_id: int) -> Optional[GameSnapshot]:
+        """Get game with its players as a read-only snapshot"""
+        return await self._load_snapshot(Game.id == game_id)
+
+    async def get_active_snapshot_for_group(self, group_id: int) -> Optional[GameSnapshot]:
+        """Get active game of a group with its players as a read-only snapshot"""
+        return await self._load_snapshot(
+            and_(
+                Game.group_id == group_id,
+                Game.status.in_([GameStatus.REGISTRATION, GameStatus.IN_PROGRESS])
+            )
+        )
+
+    async def _load_snapshot(self, condition: ColumnElement[bool]) -> Optional[GameSnapshot]:
+        # One joined query for game, players and their names, without ORM entities
+        result = await self.session.execute(
+            select(
+                Game.id,
+                Game.group_id,
+                Game.status,
+                Game.location_id,
+                Game.player_order,
+                Game.current_player_index,
+                GamePlayer.user_id,
+                GamePlayer.is_spy,
+                GamePlayer.is_eliminated,
+                User.first_name,
+                User.username
+            )
+            .outerjoin(GamePlayer, GamePlayer.game_id == Game.id)
+            .outerjoin(User, User.id == GamePlayer.user_id)
+            .where(condition)
+            .order_by(Game.id, GamePlayer.id)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+
+        game = rows[0]
+        return GameSnapshot(
+            id=game.id,
+            group_id=game.group_id,
+            status=game.status,
+            location_id=game.location_id,
+            player_order=tuple(game.player_order or ()),
+            current_player_index=game.current_player_index or 0,
+            players=tuple(
+                PlayerSnapshot(
+                    user_id=row.user_id,
+                    first_name=row.first_name,
+                    username=row.username,
+                    is_spy=row.is_spy,
+                    is_eliminated=row.is_eliminated
+                )
+                for row in rows
+                if row.id == game.id and row.user_id is not None
+            )
+        )
+
+    async def get_turns_in_progress(self) -> list[tuple[int, int, Optional[list[int]], int]]:
+        """(group ID, game ID, player order, current index) of every game in progress"""
+        result = await self.session.execute(
+            select(Game.group_id, Game.id, Game.player_order, Game.current_player_index)
+            .where(Game.status == GameStatus.IN_PROGRESS)
+        )
+        return [tuple(row) for row in result]
+
+    async def get_turn_deadlines(self) -> list[tuple[int, int, datetime, Optional[list[int]], int]]:
+        """(game ID, group ID, deadline, player order, current index) of every timed turn"""
+        result = await self.session.execute(
+            select(Game.id, Game.group_id, Game.turn_deadline, Game.player_order, Game.current_player_index)
+            .where(
+                and_(
+                    Game.turn_deadline.is_not(None),
+                    Game.status == GameStatus.IN_PROGRESS
+                )
+            )
+        )
+        return [tuple(row) for row in result]
+
     async def create(self, group_id: int) -> Game:
         """Create new game"""
         game = Game(
@@ -43,13 +157,22 @@ class GameRepository:
             status=GameStatus.REGISTRATION
         )
         self.session.add(game)
-        await self.session.commit()
-        await self.session.refresh(game)
+        await self.session.flush()
         return game
 
     async def add_player(self, game_id: int, user_id: int) -> Optional[GamePlayer]:
         """Add player to game"""
-        # Check if player already in game
+        # Single round trip: insert, or fall through if the player already joined
+        result = await self.session.execute(
+            insert(GamePlayer)
+            .values(game_id=game_id, user_id=user_id, is_spy=False, is_eliminated=False, joined_at=datetime.utcnow())
+            .on_conflict_do_nothing(constraint="uq_game_players_game_id_user_id")
+            .returning(GamePlayer)
+        )
+        player = result.scalar_one_or_none()
+        if player:
+            return player
+
         result = await self.session.execute(
             select(GamePlayer).where(
                 and_(
@@ -58,57 +181,129 @@ class GameRepository:
                 )
             )
         )
-        existing = result.scalar_one_or_none()
-        if existing:
-            return existing
-
-        player = GamePlayer(
-            game_id=game_id,
-            user_id=user_id
-        )
-        self.session.add(player)
-        await self.session.commit()
-        await self.session.refresh(player)
-        return player
+        return result.scalar_one_or_none()
 
     async def start_game(
         self,
         game_id: int,
         location_id: int,
         spy_user_ids: list[int],
-        player_order: list[int]
+        player_order: list[int],
+        turn_timeout: int = 0
     ) -> Optional[Game]:
         """Start the game"""
-        game = await self.get_by_id(game_id, load_players=True)
+        result = await self.session.execute(
+            update(Game)
+            .where(Game.id == game_id)
+            .values(
+                status=GameStatus.IN_PROGRESS,
+                location_id=location_id,
+                started_at=datetime.utcnow(),
+                player_order=player_order,
+                current_player_index=0,
+                turn_deadline=_turn_deadline(turn_timeout)
+            )
+            .returning(Game)
+            .execution_options(synchronize_session="fetch")
+        )
+        game = result.scalar_one_or_none()
         if not game:
             return None
 
-        # Set game status
-        game.status = GameStatus.IN_PROGRESS
-        game.location_id = location_id
-        game.started_at = datetime.utcnow()
-        game.player_order = player_order
-        game.current_player_index = 0
-
         # Mark spies
-        for player in game.players:
-            if player.user_id in spy_user_ids:
-                player.is_spy = True
+        await self.session.execute(
+            update(GamePlayer)
+            .where(
+                and_(
+                    GamePlayer.game_id == game_id,
+                    GamePlayer.user_id.in_(spy_user_ids)
+                )
+            )
+            .values(is_spy=True)
+            .execution_options(synchronize_session=False)
+        )
 
-        await self.session.commit()
-        await self.session.refresh(game)
+        active_game_index.set_turn(game.group_id, game.id, player_order, 0)
         return game
 
-    async def next_player(self, game_id: int) -> Optional[Game]:
-        """Move to next player"""
-        game = await self.get_by_id(game_id)
-        if not game or game.status != GameStatus.IN_PROGRESS:
-            return None
+    async def next_player(
+        self,
+        game_id: int,
+        expected_user_id: Optional[int] = None,
+        turn_timeout: int = 0
+    ) -> Optional[TurnMove]:
+        """
+        Move to next player
 
-        game.current_player_index = (game.current_player_index + 1) % len(game.player_order)
-        await self.session.commit()
-        await self.session.refresh(game)
-        return game
+        With ``expected_user_id`` the turn only moves if it is that player's
+        turn, so a late reply can't skip the player after them. With
+        ``turn_timeout`` the new turn gets a deadline that many seconds away.
+        """
+        conditions = [
+            Game.id == game_id,
+            Game.status == GameStatus.IN_PROGRESS
+        ]
+        if expected_user_id is not None:
+            current_user_id = Game.player_order.op("->>", return_type=Text)(Game.current_player_index)
+            conditions.append(cast(current_user_id, BigInteger) == expected_user_id)
+        return await self._advance_turn(conditions, turn_timeout)
+
+    async def skip_turn(self, game_id: int, user_id: int, turn_timeout: int) -> Optional[Game]:
+        """
+        Move past ``user_id`` if it is still their turn and its deadline has passed
+
+        A skip is not player activity, so ``updated_at`` is left alone and
+        a timed game nobody plays still goes stale for the reaper.
+        """
+        current_user_id = Game.player_order.op("->>", return_type=Text)(Game.current_player_index)
+        moved = await self._advance_turn(
+            [
+                Game.id == game_id,
+                Game.status == GameStatus.IN_PROGRESS,
+                cast(current_user_id, BigInteger) == user_id,
+                Game.turn_deadline <= datetime.utcnow()
+            ],
+            turn_timeout,
+            touch=False
+        )
+        return moved.game if moved else None
+
+    async def _advance_turn(
+        self,
+        conditions: list[ColumnElement[bool]],
+        turn_timeout: int,
+        touch: bool = True
+    ) -> Optional[TurnMove]:
+        # Advanced inside the database so concurrent /next calls can't lose an update
+        values = {
+            "current_player_index": (Game.current_player_index + 1)
+            % func.greatest(func.json_array_length(Game.player_order), 1),
+            "turn_deadline": _turn_deadline(turn_timeout)
+        }
+        if not touch:
+            # An explicit value keeps the onupdate default from firing
+            values["updated_at"] = Game.updated_at
+        # RETURNING sees the new row, so this is the player whose turn it is now
+        current_user_id = Game.player_order.op("->>", return_type=Text)(Game.current_player_index)
+        player_name = (
+            select(func.coalesce(User.first_name, User.username))
+            .where(User.id == cast(current_user_id, BigInteger))
+            .correlate(Game)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            update(Game)
+            .where(and_(*conditions))
+            .values(**values)
+            .returning(Game, player_name)
+            .execution_options(synchronize_session="fetch")
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        game, name = row
+        active_game_index.set_turn(game.group_id, game.id, game.player_order, game.current_player_index)
+        return TurnMove(game, name or f"User {game.player_order[game.current_player_index]}")
 
     async def eliminate_player(self, game_id: int, user_id: int) -> bool:
         """Eliminate player from game"""
@@ -123,7 +318,7 @@ class GameRepository:
         player = result.scalar_one_or_none()
         if player:
             player.is_eliminated = True
-            await self.session.commit()
+            await self.session.flush()
             return True
         return False
 
@@ -135,11 +330,12 @@ class GameRepository:
 
         game.status = GameStatus.FINISHED
         game.finished_at = datetime.utcnow()
-        await self.session.commit()
-        await self.session.refresh(game)
+        game.turn_deadline = None
+        await self.session.flush()
+        active_game_index.discard(game.group_id)
         return game
 
-    async def resume_game(self, game_id: int) -> Optional[Game]:
+    async def resume_game(self, game_id: int, turn_timeout: int = 0) -> Optional[Game]:
         """Resume finished game (undo endgame)"""
         game = await self.get_by_id(game_id)
         if not game or game.status != GameStatus.FINISHED:
@@ -147,31 +343,104 @@ class GameRepository:
 
         game.status = GameStatus.IN_PROGRESS
         game.finished_at = None
-        await self.session.commit()
-        await self.session.refresh(game)
+        game.turn_deadline = _turn_deadline(turn_timeout)
+        await self.session.flush()
+        active_game_index.set_turn(game.group_id, game.id, game.player_order, game.current_player_index or 0)
         return game
 
-    async def add_vote(self, game_id: int, voter_id: int, voted_for_id: int) -> Optional[Game]:
-        """Add vote for player"""
-        game = await self.get_by_id(game_id, load_players=True)
-        if not game or game.status != GameStatus.IN_PROGRESS:
-            return None
+    async def close_stale_games(self, idle_before: datetime, limit: int) -> list[tuple[int, int, str]]:
+        """
+        Finish up to ``limit`` active games that have not changed since ``idle_before``
 
-        if game.votes is None:
-            game.votes = {}
+        Games locked by a concurrent transaction are skipped rather than
+        waited for: someone is playing them. Returns (game ID, group ID,
+        group language) of the closed games.
+        """
+        active = Game.status.in_([GameStatus.REGISTRATION, GameStatus.IN_PROGRESS])
+        stale = (
+            select(Game.id)
+            .where(and_(active, Game.updated_at < idle_before))
+            .order_by(Game.updated_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(Game)
+            .where(and_(Game.id.in_(stale), active, Group.id == Game.group_id))
+            .values(
+                status=GameStatus.FINISHED,
+                finished_at=datetime.utcnow(),
+                turn_deadline=None
+            )
+            .returning(Game.id, Game.group_id, Group.language)
+            .execution_options(synchronize_session=False)
+        )
+        closed = [tuple(row) for row in result]
+        # The reaper runs in one worker; the chats' own workers hold their index entries
+        for _, group_id, _ in closed:
+            on_commit(self.session, lambda group_id=group_id: invalidate_shared(active_game_index, group_id))
+        return closed
 
-        game.votes[str(voter_id)] = voted_for_id
-        await self.session.commit()
-        await self.session.refresh(game)
-        return game
+    async def add_vote(self, game_id: int, voter_id: int, voted_for_id: int) -> bool:
+        """Add or change a player's vote, returns False if the game is not in progress"""
+        stmt = insert(GameVote).from_select(
+            ["game_id", "voter_id", "target_id", "voted_at"],
+            select(
+                literal(game_id, Integer),
+                literal(voter_id, BigInteger),
+                literal(voted_for_id, BigInteger),
+                func.now()
+            ).where(
+                exists().where(
+                    and_(
+                        Game.id == game_id,
+                        Game.status == GameStatus.IN_PROGRESS
+                    )
+                )
+            )
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GameVote.game_id, GameVote.voter_id],
+            set_={
+                "target_id": stmt.excluded.target_id,
+                "voted_at": stmt.excluded.voted_at
+            }
+        ).returning(GameVote.voter_id)
 
-    async def clear_votes(self, game_id: int) -> Optional[Game]:
-        """Clear all votes"""
-        game = await self.get_by_id(game_id)
-        if not game:
-            return None
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
 
-        game.votes = {}
-        await self.session.commit()
-        await self.session.refresh(game)
-        return game
+    async def get_vote_tally(self, game_id: int) -> VoteTally:
+        """Count votes per accused player together with vote and player totals"""
+        votes = func.count().label("votes")
+        result = await self.session.execute(
+            select(
+                GameVote.target_id,
+                votes,
+                func.sum(func.count()).over().label("total_votes"),
+                select(func.count())
+                .select_from(GamePlayer)
+                .where(GamePlayer.game_id == game_id)
+                .scalar_subquery()
+                .label("total_players")
+            )
+            .where(GameVote.game_id == game_id)
+            .group_by(GameVote.target_id)
+            .order_by(votes.desc(), GameVote.target_id)
+        )
+        rows = result.all()
+        if not rows:
+            return VoteTally(counts=[], total_votes=0, total_players=0)
+
+        return VoteTally(
+            counts=[(row.target_id, row.votes) for row in rows],
+            total_votes=int(rows[0].total_votes),
+            total_players=rows[0].total_players
+        )
+
+    async def clear_votes(self, game_id: int) -> int:
+        """Clear all votes, returns number of removed votes"""
+        result = await self.session.execute(
+            delete(GameVote).where(GameVote.game_id == game_id)
+        )
+        return result.rowcount
@@ -1,8 +1,13 @@
 from typing import Optional
+from datetime import datetime
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.database import on_commit
 from app.database.models import Group
+from app.database.upsert import run_upsert
+from app.database.snapshots import GroupSettings
+from app.cache import group_settings_cache, MISSING
 
 
 class GroupRepository:
@@ -31,8 +36,8 @@ class GroupRepository:
             language=language
         )
         self.session.add(group)
-        await self.session.commit()
-        await self.session.refresh(group)
+        await self.session.flush()
+        self._cache_after_commit(GroupSettings.from_model(group))
         return group
     
     async def get_or_create(
@@ -42,16 +47,49 @@ class GroupRepository:
         language: str = "ru"
     ) -> tuple[Group, bool]:
         """Get or create group, returns (group, created)"""
-        group = await self.get_by_id(group_id)
-        if group:
-            # Update title if changed
-            if group.title != title:
-                group.title = title
-                await self.session.commit()
-            return group, False
-        
-        group = await self.create(group_id, title, language)
-        return group, True
+        # Update title if changed, in the same statement
+        now = datetime.utcnow()
+        group, created = await run_upsert(
+            self.session,
+            Group,
+            values=dict(
+                id=group_id,
+                title=title,
+                language=language,
+                created_at=now,
+                updated_at=now
+            ),
+            update_fields=["title"],
+            touch={"updated_at": now}
+        )
+        self._cache_after_commit(GroupSettings.from_model(group))
+        return group, created
+
+    async def get_settings(self, group_id: int) -> Optional[GroupSettings]:
+        """Get group settings snapshot (cached)"""
+        snapshot = group_settings_cache.get(group_id)
+        if snapshot is MISSING:
+            group = await self.get_by_id(group_id)
+            if not group:
+                return None
+            snapshot = GroupSettings.from_model(group)
+            # The row may have been written by this (still uncommitted) transaction
+            self._cache_after_commit(snapshot)
+        return snapshot
+
+    async def ensure(
+        self,
+        group_id: int,
+        title: str,
+        language: str = "ru"
+    ) -> GroupSettings:
+        """Make sure the group exists with an up-to-date title, skipping the database when cached"""
+        snapshot = group_settings_cache.get(group_id)
+        if snapshot is not MISSING and snapshot.title == title:
+            return snapshot
+
+        group, _ = await self.get_or_create(group_id, title, language)
+        return GroupSettings.from_model(group)
     
     async def update_settings(
         self,
@@ -59,7 +97,8 @@ class GroupRepository:
         language: Optional[str] = None,
         min_players: Optional[int] = None,
         max_players: Optional[int] = None,
-        spy_percentage: Optional[int] = None
+        spy_percentage: Optional[int] = None,
+        turn_timeout: Optional[int] = None
     ) -> Optional[Group]:
         """Update group settings"""
         group = await self.get_by_id(group_id)
@@ -74,7 +113,14 @@ class GroupRepository:
             group.max_players = max_players
         if spy_percentage is not None:
             group.spy_percentage = spy_percentage
+        if turn_timeout is not None:
+            group.turn_timeout = turn_timeout
         
-        await self.session.commit()
-        await self.session.refresh(group)
+        await self.session.flush()
+        self._cache_after_commit(GroupSettings.from_model(group))
         return group
+
+    def _cache_after_commit(self, snapshot: GroupSettings) -> None:
+        # Write-through, but only once the change is durable; a rolled back
+        # insert must not leave a cached group that does not exist
+        on_commit(self.session, lambda: group_settings_cache.set(snapshot.id, snapshot))
@@ -1,8 +1,31 @@
-from typing import Optional
-from sqlalchemy import select, and_, or_
+import hashlib
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional
+from sqlalchemy import select, and_, or_, func, cast, Integer, ColumnElement
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import Location
+from app.cache import LocationNames, invalidate_shared, location_names_cache, normalize_name, MISSING
+from app.database.database import on_commit
+from app.database.models import Game, Location
+
+
+# Languages whose name identifies a location, in order of preference
+NAME_HASH_LANGUAGES = ("ru", "en", "az")
+
+# PostgreSQL accepts at most this many bind parameters in one statement
+MAX_BIND_PARAMS = 32767
+
+
+def location_name_hash(name_translations: dict) -> str:
+    """Hash of the normalized primary name (Russian, else English, else Azerbaijani) that identifies duplicates"""
+    name = next(
+        (name_translations[lang] for lang in NAME_HASH_LANGUAGES if name_translations.get(lang)),
+        None
+    )
+    if name is None:
+        name = name_translations[min(name_translations)]
+    return hashlib.md5(normalize_name(name).encode()).hexdigest()
 
 
 class LocationRepository:
@@ -33,6 +56,51 @@ class LocationRepository:
         )
         return list(result.scalars().all())
     
+    async def pick_random_for_group(self, group_id: int, exclude_recent: int = 0) -> Optional[Location]:
+        """
+        Pick a random active location for a group (default + group-specific)
+
+        The pick happens in the database, at a random offset into the
+        eligible rows, so the catalog is never loaded. Locations of the
+        group's last ``exclude_recent`` games are skipped, unless that
+        leaves nothing to pick from.
+        """
+        eligible = [
+            or_(
+                Location.group_id == group_id,
+                Location.group_id.is_(None)
+            ),
+            Location.is_active == True
+        ]
+        if exclude_recent > 0:
+            recent = (
+                select(Game.location_id)
+                .where(
+                    and_(
+                        Game.group_id == group_id,
+                        Game.location_id.is_not(None)
+                    )
+                )
+                .order_by(Game.id.desc())
+                .limit(exclude_recent)
+            )
+            location = await self._pick_random(and_(*eligible, Location.id.not_in(recent)))
+            if location:
+                return location
+        return await self._pick_random(and_(*eligible))
+
+    async def _pick_random(self, condition: ColumnElement[bool]) -> Optional[Location]:
+        # One round trip: the offset is drawn from the eligible row count in the same statement
+        eligible_count = select(func.count()).select_from(Location).where(condition).scalar_subquery()
+        result = await self.session.execute(
+            select(Location)
+            .where(condition)
+            .order_by(Location.id)
+            .offset(cast(func.floor(func.random() * eligible_count), Integer))
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
     async def get_default_locations(self) -> list[Location]:
         """Get all default locations"""
         result = await self.session.execute(
@@ -45,26 +113,150 @@ class LocationRepository:
         )
         return list(result.scalars().all())
     
+    async def get_name_indexes(self, group_id: int) -> tuple[LocationNames, LocationNames]:
+        """Name indexes of default and group-specific locations (cached)"""
+        return await self._get_names(None), await self._get_names(group_id)
+
+    async def _get_names(self, group_id: Optional[int]) -> LocationNames:
+        names = location_names_cache.get(group_id)
+        if names is MISSING:
+            owner = Location.group_id.is_(None) if group_id is None else Location.group_id == group_id
+            result = await self.session.execute(
+                select(Location.id, Location.name_translations, Location.aliases).where(
+                    and_(
+                        owner,
+                        Location.is_active == True
+                    )
+                )
+            )
+            names = LocationNames.build(result.all())
+            location_names_cache.set(group_id, names)
+        return names
+
     async def create(
         self,
         name_translations: dict,
-        group_id: Optional[int] = None
-    ) -> Location:
-        """Create new location"""
-        location = Location(
-            name_translations=name_translations,
-            group_id=group_id
+        group_id: Optional[int] = None,
+        aliases: Optional[list[str]] = None
+    ) -> Optional[Location]:
+        """Create new location, returns None if a location with the same name exists"""
+        name_hash = location_name_hash(name_translations)
+        if group_id is not None and await self._existing_default_hashes([name_hash]):
+            return None
+
+        result = await self.session.execute(
+            insert(Location)
+            .values(
+                name_translations=name_translations,
+                aliases=aliases or [],
+                group_id=group_id,
+                name_hash=name_hash,
+                is_active=True,
+                created_at=datetime.utcnow()
+            )
+            .on_conflict_do_nothing()
+            .returning(Location)
         )
-        self.session.add(location)
-        await self.session.commit()
-        await self.session.refresh(location)
+        location = result.scalar_one_or_none()
+        if location:
+            self._invalidate_names_after_commit(group_id)
         return location
     
+    async def bulk_create(
+        self,
+        locations: Iterable[tuple[dict, list[str]]],
+        group_id: Optional[int] = None
+    ) -> int:
+        """
+        Insert (name translations, aliases) locations with one statement
+
+        Locations whose name already exists among the group's active
+        locations, or among default locations, are skipped. Returns the
+        number of inserted locations. Larger batches than one statement
+        can bind are inserted with several statements.
+        """
+        now = datetime.utcnow()
+        rows: dict[str, dict] = {}
+        for name_translations, aliases in locations:
+            name_hash = location_name_hash(name_translations)
+            rows.setdefault(name_hash, {
+                "name_translations": name_translations,
+                "aliases": aliases,
+                "group_id": group_id,
+                "name_hash": name_hash,
+                "is_active": True,
+                "created_at": now
+            })
+        if group_id is not None:
+            for name_hash in await self._existing_default_hashes(list(rows)):
+                del rows[name_hash]
+        if not rows:
+            return 0
+
+        values = list(rows.values())
+        chunk_size = MAX_BIND_PARAMS // len(values[0])
+        inserted = 0
+        for start in range(0, len(values), chunk_size):
+            # Conflicts with the unique name index (same group, or both default) are skipped in the database
+            result = await self.session.execute(
+                insert(Location)
+                .values(values[start:start + chunk_size])
+                .on_conflict_do_nothing()
+                .returning(Location.id)
+            )
+            inserted += len(result.all())
+        if inserted:
+            self._invalidate_names_after_commit(group_id)
+        return inserted
+
+    async def _existing_default_hashes(self, name_hashes: list[str]) -> set[str]:
+        existing = set()
+        for start in range(0, len(name_hashes), MAX_BIND_PARAMS):
+            result = await self.session.execute(
+                select(Location.name_hash).where(
+                    and_(
+                        func.coalesce(Location.group_id, 0) == 0,
+                        Location.name_hash.in_(name_hashes[start:start + MAX_BIND_PARAMS]),
+                        Location.is_active == True
+                    )
+                )
+            )
+            existing.update(result.scalars())
+        return existing
+
+    async def stream_for_group(
+        self,
+        group_id: Optional[int],
+        batch_size: int = 1000
+    ) -> AsyncIterator[tuple[dict, list[str]]]:
+        """(name translations, aliases) of the active locations of a group, or default ones for None"""
+        # Server-side cursor: rows are fetched batch_size at a time
+        owner = Location.group_id.is_(None) if group_id is None else Location.group_id == group_id
+        result = await self.session.stream(
+            select(Location.name_translations, Location.aliases)
+            .where(
+                and_(
+                    owner,
+                    Location.is_active == True
+                )
+            )
+            .order_by(Location.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row.name_translations, row.aliases or []
+
     async def deactivate(self, location_id: int) -> bool:
         """Deactivate location"""
         location = await self.get_by_id(location_id)
         if location:
             location.is_active = False
-            await self.session.commit()
+            await self.session.flush()
+            self._invalidate_names_after_commit(location.group_id)
             return True
         return False
+
+    def _invalidate_names_after_commit(self, group_id: Optional[int]) -> None:
+        # Before the commit (or inside a savepoint that may still roll back)
+        # a concurrent lookup would only cache the old names again
+        on_commit(self.session, lambda: invalidate_shared(location_names_cache, group_id))
@@ -1,8 +1,12 @@
 from typing import Optional
-from sqlalchemy import select
+from datetime import datetime
+from sqlalchemy import select, update, exists, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.database import on_commit
 from app.database.models import User
+from app.database.upsert import run_upsert
+from app.cache import invalidate_shared, user_language_cache, MISSING
 
 
 class UserRepository:
@@ -18,6 +22,31 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
     
+    async def get_language(self, user_id: int) -> Optional[str]:
+        """Get user's preferred language (cached), None if user is not registered"""
+        language = user_language_cache.get(user_id)
+        if language is MISSING:
+            user = await self.get_by_id(user_id)
+            language = user.language if user else None
+            user_language_cache.set(user_id, language)
+        return language
+
+    async def is_registered(self, user_id: int) -> bool:
+        """
+        Whether the user is registered
+
+        Only a cached language is trusted. A cached "not registered" is
+        re-checked: the user may have just registered through another
+        worker process, whose cache invalidation reaches this one a moment
+        later.
+        """
+        language = user_language_cache.get(user_id)
+        if language is not MISSING and language is not None:
+            return True
+        user = await self.get_by_id(user_id)
+        user_language_cache.set(user_id, user.language if user else None)
+        return user is not None
+
     async def create(
         self,
         user_id: int,
@@ -35,8 +64,8 @@ class UserRepository:
             language=language
         )
         self.session.add(user)
-        await self.session.commit()
-        await self.session.refresh(user)
+        await self.session.flush()
+        self._invalidate_after_commit(user_id)
         return user
     
     async def get_or_create(
@@ -48,26 +77,75 @@ class UserRepository:
         language: str = "ru"
     ) -> tuple[User, bool]:
         """Get or create user, returns (user, created)"""
-        user = await self.get_by_id(user_id)
-        if user:
-            # Update user info if provided
-            if username:
-                user.username = username
-            if first_name:
-                user.first_name = first_name
-            if last_name:
-                user.last_name = last_name
-            await self.session.commit()
-            return user, False
-        
-        user = await self.create(user_id, username, first_name, last_name, language)
-        return user, True
-    
+        # Update user info if provided; the row is only written when something differs
+        profile = self._profile_fields(username, first_name, last_name)
+        user, created = await run_upsert(
+            self.session,
+            User,
+            values=dict(
+                id=user_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                language=language,
+                created_at=datetime.utcnow()
+            ),
+            update_fields=list(profile)
+        )
+        if created:
+            self._invalidate_after_commit(user_id)
+        return user, created
+
+    async def update_profile(
+        self,
+        user_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> bool:
+        """Update info of a registered user if it changed, returns False if user is not registered"""
+        registered = select(exists().where(User.id == user_id))
+
+        profile = self._profile_fields(username, first_name, last_name)
+        if profile:
+            # Runs as part of the same statement; the outer SELECT still sees the row
+            updated = (
+                update(User)
+                .where(
+                    and_(
+                        User.id == user_id,
+                        or_(*(getattr(User, name).is_distinct_from(value) for name, value in profile.items()))
+                    )
+                )
+                .values(**profile)
+                .returning(User.id)
+                .cte("updated")
+            )
+            registered = registered.add_cte(updated)
+
+        result = await self.session.execute(registered)
+        return bool(result.scalar())
+
+    @staticmethod
+    def _profile_fields(
+        username: Optional[str],
+        first_name: Optional[str],
+        last_name: Optional[str]
+    ) -> dict[str, str]:
+        """Provided (non-empty) profile fields"""
+        fields = {"username": username, "first_name": first_name, "last_name": last_name}
+        return {name: value for name, value in fields.items() if value}
+
     async def update_language(self, user_id: int, language: str) -> Optional[User]:
         """Update user language"""
         user = await self.get_by_id(user_id)
         if user:
             user.language = language
-            await self.session.commit()
-            await self.session.refresh(user)
+            await self.session.flush()
+            self._invalidate_after_commit(user_id)
         return user
+
+    def _invalidate_after_commit(self, user_id: int) -> None:
+        # Until the commit other sessions still read the old row, and a lookup
+        # meanwhile would cache it again; drop the entry once the change is visible
+        on_commit(self.session, lambda: invalidate_shared(user_language_cache, user_id))
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from app.database.models import GameStatus, Group
+
+
+@dataclass(frozen=True, slots=True)
+class GroupSettings:
+    """Immutable snapshot of a group's settings"""
+    id: int
+    title: str
+    language: str
+    min_players: int
+    max_players: int
+    spy_percentage: int
+    turn_timeout: int
+
+    @classmethod
+    def from_model(cls, group: Group) -> "GroupSettings":
+        return cls(
+            id=group.id,
+            title=group.title,
+            language=group.language,
+            min_players=group.min_players,
+            max_players=group.max_players,
+            spy_percentage=group.spy_percentage,
+            turn_timeout=group.turn_timeout or 0
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerSnapshot:
+    """Read-only view of a game player with the user fields handlers display"""
+    user_id: int
+    first_name: Optional[str]
+    username: Optional[str]
+    is_spy: bool
+    is_eliminated: bool
+
+    @property
+    def display_name(self) -> str:
+        return self.first_name or self.username or f"User {self.user_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class GameSnapshot:
+    """Read-only view of a game and its players, loaded in one query"""
+    id: int
+    group_id: int
+    status: GameStatus
+    location_id: Optional[int]
+    player_order: tuple[int, ...]
+    current_player_index: int
+    players: tuple[PlayerSnapshot, ...]
+
+    def get_player(self, user_id: int) -> Optional[PlayerSnapshot]:
+        return next((player for player in self.players if player.user_id == user_id), None)
+
+    def player_name(self, user_id: int) -> str:
+        player = self.get_player(user_id)
+        return player.display_name if player else f"User {user_id}"
+
+    @property
+    def current_user_id(self) -> Optional[int]:
+        if not self.player_order:
+            return None
+        return self.player_order[self.current_player_index % len(self.player_order)]
@@ -0,0 +1,82 @@
+from typing import Any, Optional
+
+from sqlalchemy import Select, select, union_all, exists, false, literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+
+def build_upsert(
+    model: type,
+    values: dict[str, Any],
+    update_fields: list[str],
+    touch: Optional[dict[str, Any]] = None
+) -> Select:
+    """
+    Build a single statement that inserts a row or updates changed fields,
+    selecting (entity, created) in both cases
+
+    On conflict the row is only written when one of ``update_fields`` differs
+    from the stored value (``touch`` values are applied along with it);
+    otherwise the existing row is read back as-is.
+    """
+    table = model.__table__
+    primary_key = list(table.primary_key.columns)
+
+    stmt = insert(model).values(**values)
+    if update_fields:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=primary_key,
+            set_={
+                **{name: stmt.excluded[name] for name in update_fields},
+                **(touch or {})
+            },
+            where=or_(*(
+                table.c[name].is_distinct_from(stmt.excluded[name])
+                for name in update_fields
+            ))
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=primary_key)
+
+    # xmax is 0 only for freshly inserted tuples
+    upserted = stmt.returning(*table.c, literal_column("xmax = 0").label("created")).cte("upserted")
+
+    # The outer query sees the snapshot from before the INSERT, so an unchanged row
+    # is read from the table while an inserted/updated one comes from RETURNING
+    unchanged = select(*table.c, false().label("created")).where(
+        *(column == values[column.name] for column in primary_key),
+        ~exists(select(upserted.c[primary_key[0].name]))
+    )
+
+    combined = union_all(select(upserted), unchanged).subquery("combined")
+    entity = aliased(model, combined, adapt_on_names=True)
+    return (
+        select(entity, combined.c.created)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def run_upsert(
+    session: AsyncSession,
+    model: type,
+    values: dict[str, Any],
+    update_fields: list[str],
+    touch: Optional[dict[str, Any]] = None
+) -> tuple[Any, bool]:
+    """Execute ``build_upsert`` and return (entity, created)"""
+    result = await session.execute(build_upsert(model, values, update_fields, touch))
+    row = result.one_or_none()
+    if row is not None:
+        return row[0], row[1]
+
+    # A concurrent transaction inserted the same key with the same values: the conflict
+    # branch wrote nothing and the row is not in this statement's snapshot. A new
+    # statement sees it (READ COMMITTED).
+    primary_key = list(model.__table__.primary_key.columns)
+    result = await session.execute(
+        select(model)
+        .where(*(column == values[column.name] for column in primary_key))
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one(), False
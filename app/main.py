@@ -1,14 +1,26 @@
 import asyncio
 import logging
+from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
 from aiogram.enums import ParseMode
 
 from app.config import settings
-from app.database.database import init_db, close_db
+from app.database.database import init_db, close_db, get_pool_stats, async_session_maker
+from app.database.repositories.game import GameRepository
+from app.cache import cache_stats, active_game_index
 from app.bot.handlers import admin, game, user
 from app.bot.middlewares.database import DatabaseMiddleware
 from app.bot.middlewares.i18n import I18nMiddleware
+from app.bot.middlewares.admin_cache import AdminCacheMiddleware
+from app.bot.middlewares.outbound import outbound_scheduler
+from app.bot.middlewares.ordering import update_ordering
+from app.bot.keyboards.inline import warm_up_keyboards
+from app.webhook import run_webhook
+from app.sharding import run_sharded, shard_of_chat
+from app.bot.utils.turn_timer import turn_timer
+from app.bot.utils.reaper import game_reaper
 
 # Configure logging
 logging.basicConfig(
@@ -18,33 +30,122 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Periodic metrics are always logged, regardless of DEBUG
+metrics_logger = logging.getLogger("app.metrics")
+metrics_logger.setLevel(logging.INFO)
 
-async def main():
-    """Main function to start the bot"""
-    
-    # Initialize database
-    await init_db()
-    
-    # Initialize bot and dispatcher
+
+async def report_metrics(interval: int):
+    """Log runtime metrics periodically"""
+    while True:
+        await asyncio.sleep(interval)
+        metrics_logger.info("DB pool: %s", get_pool_stats())
+        metrics_logger.info("Caches: %s", cache_stats())
+        metrics_logger.info("Outbound: %s", outbound_scheduler.stats())
+        metrics_logger.info("Updates: %s", update_ordering.stats())
+        metrics_logger.info("Turn timer: %s", turn_timer.stats())
+        metrics_logger.info("Reaper: %s", game_reaper.stats())
+
+
+async def load_active_games():
+    """Rebuild the in-memory index of games in progress"""
+    async with async_session_maker() as session:
+        turns = await GameRepository(session).get_turns_in_progress()
+    active_game_index.rebuild(turns)
+    logger.info("Loaded %s games in progress", len(turns))
+
+
+async def start_turn_timer(bot: Bot, i18n: I18nMiddleware, shard: Optional[tuple[int, int]] = None):
+    """Restore pending turn deadlines and start the timer"""
+    async with async_session_maker() as session:
+        deadlines = await GameRepository(session).get_turn_deadlines()
+    if shard:
+        # In sharded mode each worker times only the games of its own chats
+        index, workers = shard
+        deadlines = [row for row in deadlines if shard_of_chat(row[1], workers) == index]
+    turn_timer.start(bot, i18n, deadlines)
+
+
+async def start_reaper(bot: Bot, i18n: I18nMiddleware, shard: Optional[tuple[int, int]] = None):
+    """Start closing abandoned games periodically"""
+    if settings.REAPER_INTERVAL <= 0:
+        return
+    if shard and shard[0] != 0:
+        # One worker is enough; the others would only compete for the same rows
+        return
+    game_reaper.start(bot, i18n, settings.REAPER_INTERVAL)
+
+
+def create_bot(session: Optional[BaseSession] = None) -> Bot:
+    """Create bot whose outgoing messages go through the rate-limited scheduler"""
     bot = Bot(
         token=settings.BOT_TOKEN,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    bot.session.middleware(outbound_scheduler)
+    return bot
+
+
+def create_dispatcher() -> Dispatcher:
+    """Create dispatcher with middlewares and routers registered"""
     dp = Dispatcher()
+    dp.startup.register(load_active_games)
+    dp.startup.register(start_turn_timer)
+    dp.startup.register(start_reaper)
+    dp.shutdown.register(turn_timer.stop)
+    dp.shutdown.register(game_reaper.stop)
     
+    # Updates are handled as concurrent tasks; keep them ordered within a chat
+    dp.update.outer_middleware(update_ordering)
+
     # Register middlewares
     dp.update.middleware(DatabaseMiddleware())
-    dp.update.middleware(I18nMiddleware())
+    i18n = I18nMiddleware()
+    dp.update.middleware(i18n)
+    dp["i18n"] = i18n  # for startup hooks
+    dp.chat_member.outer_middleware(AdminCacheMiddleware())
+    dp.my_chat_member.outer_middleware(AdminCacheMiddleware())
     
+    warm_up_keyboards(i18n)
+
     # Register routers
     dp.include_router(user.router)
     dp.include_router(admin.router)
     dp.include_router(game.router)
+    return dp
+
+
+async def main():
+    """Main function to start the bot"""
+
+    # Initialize database
+    await init_db()
+
+    # Initialize bot and dispatcher
+    bot = create_bot()
+    dp = create_dispatcher()
     
+    metrics_task = None
+    if settings.METRICS_INTERVAL > 0:
+        metrics_task = asyncio.create_task(report_metrics(settings.METRICS_INTERVAL))
+
     try:
-        logger.info("Starting bot...")
-        await dp.start_polling(bot)
+        if settings.WORKERS > 1:
+            logger.info("Starting bot with %s worker processes...", settings.WORKERS)
+            # The supervisor doesn't use the database; the workers have the connection budget
+            await close_db()
+            await run_sharded(bot, dp.resolve_used_update_types())
+        elif settings.RUN_MODE == "webhook":
+            logger.info("Starting bot in webhook mode...")
+            await run_webhook(bot, dp)
+        else:
+            logger.info("Starting bot...")
+            await dp.start_polling(bot, handle_as_tasks=True, polling_timeout=settings.POLLING_TIMEOUT)
     finally:
+        if metrics_task:
+            metrics_task.cancel()
+        await outbound_scheduler.close()
         await bot.session.close()
         await close_db()
 
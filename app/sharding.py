@@ -0,0 +1,374 @@
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from aiohttp import web
+from aiogram import Bot
+
+from app.bot.middlewares.outbound import outbound_scheduler
+from app.bot.utils.rate_limit import ChatRateLimiter
+from app.cache import apply_invalidation, set_invalidation_publisher
+from app.config import settings
+from app.database.database import resize_pool
+from app.webhook import register_webhook, remove_webhook, serve, stop_on_signals
+
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("app.metrics")
+
+# Worker entry point: (index, workers, update queue, event queue, heartbeat value, heartbeat interval,
+# (pool size, max overflow))
+WorkerTarget = Callable[[int, int, Any, Any, Any, float, tuple[int, int]], None]
+
+
+def update_chat_id(update: dict[str, Any]) -> Optional[int]:
+    """Chat the raw update belongs to, or the user for chat-less updates"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+    return None
+
+
+def shard_of_chat(chat_id: int, workers: int) -> int:
+    """Index of the worker that owns the chat"""
+    return hash(chat_id) % workers
+
+
+def shard_for(update: dict[str, Any], workers: int) -> int:
+    """Index of the worker that handles the update"""
+    key = update_chat_id(update)
+    if key is None:
+        key = update["update_id"]
+    return shard_of_chat(key, workers)
+
+
+def run_worker(
+    index: int,
+    workers: int,
+    updates: Any,
+    events: Any,
+    heartbeat: Any,
+    heartbeat_interval: float,
+    pool: tuple[int, int]
+) -> None:
+    """
+    Worker process entry point: handle routed updates until a None sentinel arrives
+
+    Cache invalidations are put on ``events`` for the supervisor to pass on
+    to the other workers, and arrive from them on ``updates`` as
+    (cache name, key) tuples.
+    """
+    # Shutdown is coordinated by the supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    resize_pool(*pool)
+    set_invalidation_publisher(lambda name, key: events.put((name, key)))
+    asyncio.run(_serve_shard(index, workers, updates, heartbeat, heartbeat_interval))
+
+
+async def _beat(heartbeat: Any, interval: float) -> None:
+    # Stops when the event loop is blocked, which the supervisor treats as a hang
+    while True:
+        heartbeat.value = time.time()
+        await asyncio.sleep(interval)
+
+
+async def _serve_shard(index: int, workers: int, updates: Any, heartbeat: Any, heartbeat_interval: float) -> None:
+    # app.main imports this module for the supervisor
+    from app.main import create_bot, create_dispatcher
+    from app.database.database import close_db
+
+    # Telegram's global limit is per bot, so every worker gets its share
+    outbound_scheduler.limiter = ChatRateLimiter(global_rate=settings.TELEGRAM_GLOBAL_RATE / workers)
+
+    bot = create_bot()
+    dp = create_dispatcher()
+    dp["shard"] = (index, workers)
+    await dp.emit_startup(bot=bot, dispatcher=dp, **dp.workflow_data)
+
+    async def handle(raw: dict[str, Any]) -> None:
+        try:
+            await dp.feed_raw_update(bot, raw)
+        except Exception:
+            logger.exception("Worker %s failed to handle update %s", index, raw.get("update_id"))
+
+    beat = asyncio.create_task(_beat(heartbeat, heartbeat_interval))
+    loop = asyncio.get_running_loop()
+    tasks: set[asyncio.Task] = set()
+    logger.info("Worker %s started", index)
+
+    try:
+        while True:
+            try:
+                raw = await loop.run_in_executor(None, updates.get, True, heartbeat_interval)
+            except queue.Empty:
+                continue
+            if raw is None:
+                break
+            if isinstance(raw, tuple):
+                apply_invalidation(*raw)
+                continue
+            task = asyncio.create_task(handle(raw))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, **dp.workflow_data)
+        beat.cancel()
+        await outbound_scheduler.close()
+        await bot.session.close()
+        await close_db()
+        logger.info("Worker %s stopped", index)
+
+
+@dataclass
+class WorkerHandle:
+    index: int
+    process: multiprocessing.Process
+    updates: Any  # multiprocessing.Queue
+    events: Any  # multiprocessing.Queue of cache invalidations from the worker
+    heartbeat: Any  # multiprocessing.Value("d"), 0 until the worker is up
+    started_at: float
+    routed: int = 0
+    restarts: int = 0
+
+
+class Supervisor:
+    """
+    Starts worker processes, routes updates to them and restarts workers
+    that exit or stop sending heartbeats
+
+    Each worker has its own queue; updates still queued for a crashed
+    worker are handed to its replacement. Cache invalidations from one
+    worker are relayed to all others through their update queues.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        target: WorkerTarget = run_worker,
+        heartbeat_interval: float = settings.WORKER_HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = settings.WORKER_HEARTBEAT_TIMEOUT
+    ):
+        self.workers = workers
+        self.target = target
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._handles: list[WorkerHandle] = []
+        # Like TELEGRAM_GLOBAL_RATE, the connection budget is shared out: every worker opens its own pool
+        self.pool = (max(1, settings.DB_POOL_SIZE // workers), settings.DB_MAX_OVERFLOW // workers)
+
+    def _spawn(self, index: int, updates: Any) -> WorkerHandle:
+        events = self._ctx.Queue()
+        heartbeat = self._ctx.Value("d", 0.0, lock=False)
+        process = self._ctx.Process(
+            target=self.target,
+            args=(index, self.workers, updates, events, heartbeat, self.heartbeat_interval, self.pool),
+            name=f"spy-game-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return WorkerHandle(index, process, updates, events, heartbeat, started_at=time.time())
+
+    def start(self) -> None:
+        self._handles = [self._spawn(index, self._ctx.Queue()) for index in range(self.workers)]
+
+    def route(self, update: dict[str, Any]) -> None:
+        """Queue raw update for the worker that owns its chat"""
+        handle = self._handles[shard_for(update, self.workers)]
+        handle.routed += 1
+        handle.updates.put(update)
+
+    def ready(self) -> bool:
+        """Whether every worker has sent a heartbeat"""
+        return all(handle.heartbeat.value > 0 for handle in self._handles)
+
+    def check_workers(self) -> None:
+        """Restart workers that exited or stopped sending heartbeats"""
+        now = time.time()
+        for position, handle in enumerate(self._handles):
+            if not handle.process.is_alive():
+                reason = f"exited with code {handle.process.exitcode}"
+            elif now - max(handle.heartbeat.value, handle.started_at) > self.heartbeat_timeout:
+                reason = "stopped sending heartbeats"
+                handle.process.kill()
+                handle.process.join(5)
+            else:
+                continue
+
+            logger.error("Worker %s %s, restarting", handle.index, reason)
+            self._relay_from(handle)
+            handle.events.close()
+            replacement = self._spawn(handle.index, self._replace_queue(handle.updates))
+            replacement.routed = handle.routed
+            replacement.restarts = handle.restarts + 1
+            self._handles[position] = replacement
+
+    def _replace_queue(self, old: Any) -> Any:
+        # A worker killed mid-read may leave the queue's lock held forever,
+        # so pending updates move to a fresh queue without blocking on it
+        new = self._ctx.Queue()
+        moved = 0
+        while True:
+            try:
+                new.put(old.get_nowait())
+                moved += 1
+            except queue.Empty:
+                break
+        if moved:
+            logger.info("Moved %s pending updates to the restarted worker", moved)
+        try:
+            lost = old.qsize()
+        except NotImplementedError:
+            # macOS
+            lost = 0
+        if lost:
+            logger.error("Lost %s pending updates of the restarted worker: its queue is locked", lost)
+        old.close()
+        return new
+
+    def _relay_from(self, source: WorkerHandle) -> None:
+        while True:
+            try:
+                event = source.events.get_nowait()
+            except queue.Empty:
+                return
+            for handle in self._handles:
+                if handle is not source:
+                    handle.updates.put(event)
+
+    async def relay_events(self, interval: float = settings.WORKER_EVENT_RELAY_INTERVAL) -> None:
+        """Pass cache invalidations of each worker on to the others"""
+        while True:
+            await asyncio.sleep(interval)
+            for handle in list(self._handles):
+                self._relay_from(handle)
+
+    async def monitor(self) -> None:
+        """Check worker health periodically and log stats"""
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.check_workers()
+            if settings.METRICS_INTERVAL > 0 and time.monotonic() - last_report >= settings.METRICS_INTERVAL:
+                last_report = time.monotonic()
+                metrics_logger.info("Workers: %s", self.stats())
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Let workers finish queued updates, then stop them"""
+        for handle in self._handles:
+            handle.updates.put(None)
+        deadline = time.monotonic() + timeout
+        for handle in self._handles:
+            handle.process.join(max(0.0, deadline - time.monotonic()))
+            if handle.process.is_alive():
+                logger.warning("Worker %s did not stop in time, killing it", handle.index)
+                handle.process.kill()
+                handle.process.join()
+            handle.updates.close()
+            handle.events.close()
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Per-worker routing and health"""
+        now = time.time()
+        stats = []
+        for handle in self._handles:
+            try:
+                backlog = handle.updates.qsize()
+            except NotImplementedError:
+                # macOS
+                backlog = None
+            stats.append({
+                "worker": handle.index,
+                "alive": handle.process.is_alive(),
+                "routed": handle.routed,
+                "backlog": backlog,
+                "heartbeat_age": round(now - handle.heartbeat.value, 1) if handle.heartbeat.value else None,
+                "restarts": handle.restarts
+            })
+        return stats
+
+
+async def poll_updates(bot: Bot, allowed_updates: list[str], route: Callable[[dict[str, Any]], None]) -> None:
+    """Long-poll Telegram and pass every update on as a raw dict"""
+    offset = None
+    backoff = 1.0
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset,
+                timeout=settings.POLLING_TIMEOUT,
+                allowed_updates=allowed_updates,
+                request_timeout=settings.POLLING_TIMEOUT + 10
+            )
+        except Exception as e:
+            logger.warning("Failed to fetch updates: %s, retrying in %s s", e, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+
+        backoff = 1.0
+        for update in updates:
+            route(update.model_dump(mode="json", by_alias=True, exclude_unset=True))
+            offset = update.update_id + 1
+
+
+def build_intake_app(bot: Bot, allowed_updates: list[str], route: Callable[[dict[str, Any]], None]) -> web.Application:
+    """Webhook endpoint that passes posted updates on without parsing them"""
+
+    async def receive(request: web.Request) -> web.Response:
+        if settings.WEBHOOK_SECRET and not hmac.compare_digest(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""),
+            settings.WEBHOOK_SECRET
+        ):
+            return web.Response(status=401, text="Unauthorized")
+        route(await request.json())
+        return web.Response()
+
+    async def on_startup(app: web.Application) -> None:
+        await register_webhook(bot, allowed_updates)
+
+    async def on_shutdown(app: web.Application) -> None:
+        await remove_webhook(bot)
+
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, receive)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+async def run_sharded(bot: Bot, allowed_updates: list[str]) -> None:
+    """Receive updates in this process and handle them in WORKERS processes"""
+    stop = stop_on_signals()
+    supervisor = Supervisor(settings.WORKERS)
+    supervisor.start()
+    monitor = asyncio.create_task(supervisor.monitor())
+    relay = asyncio.create_task(supervisor.relay_events())
+
+    try:
+        if settings.RUN_MODE == "webhook":
+            await serve(build_intake_app(bot, allowed_updates, supervisor.route), stop)
+        else:
+            polling = asyncio.create_task(poll_updates(bot, allowed_updates, supervisor.route))
+            try:
+                await stop.wait()
+            finally:
+                polling.cancel()
+    finally:
+        monitor.cancel()
+        relay.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, supervisor.stop)
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+async def register_webhook(bot: Bot, allowed_updates: list[str]) -> None:
+    """Point Telegram at this server"""
+    await bot.set_webhook(
+        url=settings.webhook_url,
+        secret_token=settings.WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        drop_pending_updates=settings.WEBHOOK_DROP_PENDING_UPDATES
+    )
+    logger.info("Webhook set to %s", settings.webhook_url)
+
+
+async def remove_webhook(bot: Bot) -> None:
+    """Remove the webhook so updates queue up on Telegram's side"""
+    if settings.WEBHOOK_DELETE_ON_SHUTDOWN:
+        await bot.delete_webhook()
+        logger.info("Webhook removed")
+
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
+    await register_webhook(bot, dispatcher.resolve_used_update_types())
+
+
+async def on_shutdown(bot: Bot) -> None:
+    await remove_webhook(bot)
+
+
+def build_webhook_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    """
+    Build aiohttp application that feeds posted updates to the dispatcher
+
+    Requests without the configured secret token are rejected with 401.
+    """
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.WEBHOOK_SECRET
+    ).register(app, path=settings.WEBHOOK_PATH)
+    # Runs dispatcher startup/shutdown hooks along with the server
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def stop_on_signals() -> asyncio.Event:
+    """Event that is set on SIGINT/SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+    return stop
+
+
+async def serve(app: web.Application, stop: asyncio.Event) -> None:
+    """Serve the application on WEBHOOK_HOST:WEBHOOK_PORT until ``stop`` is set"""
+    if not settings.WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET is not set, webhook requests are not authenticated")
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+    try:
+        await site.start()
+        logger.info(
+            "Listening for updates on %s:%s%s", settings.WEBHOOK_HOST, settings.WEBHOOK_PORT, settings.WEBHOOK_PATH
+        )
+        await stop.wait()
+    finally:
+        # Stops accepting requests, then runs shutdown hooks
+        await runner.cleanup()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """Serve the webhook until SIGINT/SIGTERM"""
+    await serve(build_webhook_app(bot, dp), stop_on_signals())
@@ -15,7 +15,7 @@ from app.database.database import Base
 from app.config import settings
 
 # Import all models to ensure they are registered
-from app.database.models import User, Group, Location, Game, GamePlayer
+from app.database.models import User, Group, Location, Game, GamePlayer, GameVote
 
 # this is the Alembic Config object
 config = context.config
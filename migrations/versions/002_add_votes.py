@@ -19,6 +19,9 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
+    # A fresh database has no tables until 003
+    if not sa.inspect(op.get_bind()).has_table('games'):
+        return
     # Add votes column to games table
     op.add_column('games', sa.Column('votes', postgresql.JSON(astext_type=sa.Text()), nullable=True))
     # Set default value for existing rows
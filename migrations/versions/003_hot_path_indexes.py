@@ -0,0 +1,124 @@
+"""Create missing base tables, add indexes for hot-path game, player and location queries
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 001 was an empty placeholder: databases set up so far got their tables from
+    # Base.metadata.create_all, a fresh one has none yet. Create what is missing.
+    op.execute("""
+        DO $$ BEGIN
+            CREATE TYPE gamestatus AS ENUM ('REGISTRATION', 'IN_PROGRESS', 'FINISHED');
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id BIGINT PRIMARY KEY,
+            username VARCHAR(255),
+            first_name VARCHAR(255),
+            last_name VARCHAR(255),
+            language VARCHAR(5) NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS groups (
+            id BIGINT PRIMARY KEY,
+            title VARCHAR(255) NOT NULL,
+            language VARCHAR(5) NOT NULL,
+            min_players INTEGER NOT NULL,
+            max_players INTEGER NOT NULL,
+            spy_percentage INTEGER NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS locations (
+            id SERIAL PRIMARY KEY,
+            name_translations JSON NOT NULL,
+            group_id BIGINT REFERENCES groups (id) ON DELETE CASCADE,
+            is_active BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS games (
+            id SERIAL PRIMARY KEY,
+            group_id BIGINT NOT NULL REFERENCES groups (id) ON DELETE CASCADE,
+            location_id INTEGER REFERENCES locations (id) ON DELETE SET NULL,
+            status gamestatus NOT NULL,
+            current_player_index INTEGER NOT NULL,
+            player_order JSON NOT NULL,
+            votes JSON,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            started_at TIMESTAMP WITHOUT TIME ZONE,
+            finished_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS game_players (
+            id SERIAL PRIMARY KEY,
+            game_id INTEGER NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+            user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            is_spy BOOLEAN NOT NULL,
+            is_eliminated BOOLEAN NOT NULL,
+            joined_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+
+    # Active game lookup per group (GameRepository.get_active_game_for_group).
+    # gamestatus stores enum member names, not values.
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_games_active_group_id
+        ON games (group_id)
+        WHERE status IN ('REGISTRATION', 'IN_PROGRESS')
+    """)
+
+    # add_player used to check-then-insert, so duplicates may exist; keep the earliest row
+    op.execute("""
+        DELETE FROM game_players gp
+        USING game_players older
+        WHERE gp.game_id = older.game_id
+          AND gp.user_id = older.user_id
+          AND gp.id > older.id
+    """)
+    op.execute("""
+        DO $$ BEGIN
+            ALTER TABLE game_players
+            ADD CONSTRAINT uq_game_players_game_id_user_id UNIQUE (game_id, user_id);
+        EXCEPTION WHEN duplicate_object OR duplicate_table THEN NULL;
+        END $$
+    """)
+
+    # Location catalog per group (LocationRepository.get_all_for_group)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_locations_group_id_is_active
+        ON locations (group_id, is_active)
+    """)
+
+
+def downgrade() -> None:
+    # The base tables stay: most databases had them before this migration
+    op.drop_index('ix_locations_group_id_is_active', table_name='locations')
+    op.drop_constraint('uq_game_players_game_id_user_id', 'game_players', type_='unique')
+    op.drop_index('ix_games_active_group_id', table_name='games')
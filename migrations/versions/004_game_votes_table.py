@@ -0,0 +1,56 @@
+"""Move votes from games.votes JSON into game_votes table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'game_votes',
+        sa.Column('game_id', sa.Integer(), sa.ForeignKey('games.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('voter_id', sa.BigInteger(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('target_id', sa.BigInteger(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('voted_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('game_id', 'voter_id'),
+    )
+
+    # Copy existing {voter_id: voted_for_id} maps, skipping entries that point at unknown users
+    op.execute("""
+        INSERT INTO game_votes (game_id, voter_id, target_id)
+        SELECT g.id, v.key::bigint, (v.value #>> '{}')::bigint
+        FROM games g
+        CROSS JOIN LATERAL json_each(g.votes) AS v
+        WHERE g.votes IS NOT NULL
+          AND json_typeof(g.votes) = 'object'
+          AND EXISTS (SELECT 1 FROM users u WHERE u.id = v.key::bigint)
+          AND EXISTS (SELECT 1 FROM users u WHERE u.id = (v.value #>> '{}')::bigint)
+        ON CONFLICT DO NOTHING
+    """)
+
+    op.drop_column('games', 'votes')
+
+
+def downgrade() -> None:
+    op.add_column('games', sa.Column('votes', postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.execute("""
+        UPDATE games g
+        SET votes = COALESCE(
+            (SELECT json_object_agg(v.voter_id::text, v.target_id) FROM game_votes v WHERE v.game_id = g.id),
+            '{}'::json
+        )
+    """)
+    op.drop_table('game_votes')
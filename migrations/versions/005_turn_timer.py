@@ -0,0 +1,34 @@
+"""Add per-group turn timeout and per-game turn deadline
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE groups ADD COLUMN IF NOT EXISTS turn_timeout INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE games ADD COLUMN IF NOT EXISTS turn_deadline TIMESTAMP WITHOUT TIME ZONE")
+
+    # Only timed turns are indexed, so restoring deadlines at startup reads just those rows
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_games_turn_deadline
+        ON games (turn_deadline)
+        WHERE turn_deadline IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_games_turn_deadline', table_name='games')
+    op.drop_column('games', 'turn_deadline')
+    op.drop_column('groups', 'turn_timeout')
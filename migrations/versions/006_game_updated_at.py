@@ -0,0 +1,35 @@
+"""Track when games last changed, for closing abandoned games
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE games ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE")
+    op.execute("""
+        UPDATE games
+        SET updated_at = COALESCE(finished_at, started_at, created_at, now() AT TIME ZONE 'utc')
+        WHERE updated_at IS NULL
+    """)
+    op.execute("ALTER TABLE games ALTER COLUMN updated_at SET NOT NULL")
+
+    # The reaper reads the oldest active games. A partial index with the active-status
+    # predicate would also match get_active_game_for_group and shadow ix_games_active_group_id.
+    op.execute("CREATE INDEX IF NOT EXISTS ix_games_status_updated_at ON games (status, updated_at)")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_games_status_updated_at', table_name='games')
+    op.drop_column('games', 'updated_at')
@@ -0,0 +1,24 @@
+"""Add location aliases accepted by /guess
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE locations ADD COLUMN IF NOT EXISTS aliases JSON NOT NULL DEFAULT '[]'")
+
+
+def downgrade() -> None:
+    op.drop_column('locations', 'aliases')
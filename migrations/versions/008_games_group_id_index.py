@@ -0,0 +1,25 @@
+"""Index games by group for recent-location lookups
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Latest games of a group, newest first; finished games included
+    op.execute("CREATE INDEX IF NOT EXISTS ix_games_group_id_id ON games (group_id, id)")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_games_group_id_id', table_name='games')
@@ -0,0 +1,72 @@
+"""Add normalized location name hash for deduplicating imports
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import hashlib
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Copy of the app's name hash as of this revision, so later changes to it don't rewrite history
+def location_name_hash(name_translations: dict) -> str:
+    name = next(
+        (name_translations[lang] for lang in ("ru", "en", "az") if name_translations.get(lang)),
+        None
+    )
+    if name is None:
+        name = name_translations[min(name_translations)]
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return hashlib.md5(" ".join(folded.split()).encode()).hexdigest()
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE locations ADD COLUMN IF NOT EXISTS name_hash VARCHAR(32)")
+
+    # Names are normalized in Python (accent folding), so the backfill runs here.
+    # Of active duplicates already in the table only the oldest gets a hash;
+    # the others stay outside the unique index.
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text("SELECT id, group_id, name_translations, is_active FROM locations ORDER BY id")
+        .columns(name_translations=sa.JSON)
+    ).all()
+
+    seen = set()
+    updates = []
+    for location_id, group_id, name_translations, is_active in rows:
+        if not name_translations:
+            continue
+        name_hash = location_name_hash(name_translations)
+        if is_active:
+            key = (group_id or 0, name_hash)
+            if key in seen:
+                continue
+            seen.add(key)
+        updates.append({"id": location_id, "name_hash": name_hash})
+
+    if updates:
+        bind.execute(sa.text("UPDATE locations SET name_hash = :name_hash WHERE id = :id"), updates)
+
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_locations_scope_name_hash
+        ON locations (COALESCE(group_id, 0), name_hash)
+        WHERE is_active AND name_hash IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_locations_scope_name_hash', table_name='locations')
+    op.drop_column('locations', 'name_hash')
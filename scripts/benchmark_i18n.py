@@ -0,0 +1,53 @@
+"""
+Micro-benchmark: flat translation catalog vs. the previous nested-dict lookup
+"""
+import sys
+import timeit
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.bot.middlewares.i18n import I18nMiddleware
+
+
+def legacy_get_text(translations: dict, lang: str, key: str, **kwargs) -> str:
+    """get_text as it was before the catalog was compiled"""
+    keys = key.split(".")
+    text = translations.get(lang, translations["ru"])
+
+    for k in keys:
+        text = text.get(k, key)
+        if isinstance(text, str):
+            break
+
+    if isinstance(text, str) and kwargs:
+        return text.format(**kwargs)
+    return text if isinstance(text, str) else key
+
+
+CASES = [
+    ("static", "en", "buttons.join", {}),
+    ("placeholders", "ru", "game.next_player", {"name": "Alice"}),
+    ("unknown language", "de", "game.joined", {}),
+]
+
+
+def main(number: int = 200_000):
+    i18n = I18nMiddleware()
+
+    for label, lang, key, kwargs in CASES:
+        assert i18n.get_text(lang, key, **kwargs) == legacy_get_text(i18n.translations, lang, key, **kwargs)
+
+        legacy = timeit.timeit(lambda: legacy_get_text(i18n.translations, lang, key, **kwargs), number=number)
+        current = timeit.timeit(lambda: i18n.get_text(lang, key, **kwargs), number=number)
+
+        print(
+            f"{label:<18} legacy {legacy / number * 1e9:7.0f} ns  "
+            f"catalog {current / number * 1e9:7.0f} ns  "
+            f"x{legacy / current:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: update throughput of the sharded supervisor with 1..N worker processes
+Workers parse every update like the dispatcher does and then burn a fixed
+amount of CPU in place of handler work, so no Telegram or database is needed.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram.types import Update
+
+from app.sharding import Supervisor
+
+
+def benchmark_worker(index, workers, updates, heartbeat, heartbeat_interval, processed, work_ms):
+    """Worker that parses updates and simulates handler CPU time"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    heartbeat.value = time.time()
+    work = work_ms / 1000
+    while True:
+        raw = updates.get()
+        if raw is None:
+            break
+        Update.model_validate(raw)
+        deadline = time.perf_counter() + work
+        while time.perf_counter() < deadline:
+            pass
+        with processed.get_lock():
+            processed.value += 1
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": chat_id, "type": "supergroup", "title": "Benchmark"},
+            "from": {"id": 1000 + update_id % 50, "is_bot": False, "first_name": "Player"},
+            "text": "/help",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}]
+        }
+    }
+
+
+def run(workers: int, updates: list[dict], work_ms: float) -> float:
+    """Route all updates and return updates handled per second"""
+    processed = multiprocessing.get_context("spawn").Value("q", 0)
+    supervisor = Supervisor(workers, target=partial(benchmark_worker, processed=processed, work_ms=work_ms))
+    supervisor.start()
+    try:
+        while not supervisor.ready():
+            time.sleep(0.05)
+
+        started = time.perf_counter()
+        for update in updates:
+            supervisor.route(update)
+        while processed.value < len(updates):
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - started
+    finally:
+        supervisor.stop()
+
+    routed = [worker["routed"] for worker in supervisor.stats()]
+    print(f"  routed per worker: {routed}")
+    return len(updates) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--work-ms", type=float, default=1.0, help="simulated handler CPU time per update")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    updates = [make_update(i, -1000000000000 - i % args.chats) for i in range(args.updates)]
+
+    counts = []
+    workers = 1
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+
+    baseline = None
+    for workers in counts:
+        rate = run(workers, updates, args.work_ms)
+        baseline = baseline or rate
+        print(f"{workers:>3} workers: {rate:9.0f} updates/s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
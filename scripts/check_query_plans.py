@@ -0,0 +1,139 @@
+"""
+Script to verify that hot-path queries are served by their indexes
+Queries are checked as the bot runs them: prepared, with the generic plan
+asyncpg's cached statements end up using. Run this after `alembic upgrade
+head` against a database with realistic data (e.g. a restored backup); on
+tiny tables a sequential scan is cheapest and the check fails.
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, and_, or_, func, literal
+
+from app.database.database import engine
+from app.database.models import Game, GamePlayer, GameStatus, Location
+
+
+SAMPLE_GROUP_ID = -1001234567890
+SAMPLE_USER_ID = 123456789
+SAMPLE_GAME_ID = 1
+
+# (description, statement, index expected in the plan)
+HOT_QUERIES = [
+    (
+        "GameRepository.get_active_game_for_group",
+        select(Game).where(
+            and_(
+                Game.group_id == SAMPLE_GROUP_ID,
+                Game.status.in_([GameStatus.REGISTRATION, GameStatus.IN_PROGRESS])
+            )
+        ),
+        "ix_games_active_group_id",
+    ),
+    (
+        "GameRepository.add_player / eliminate_player",
+        select(GamePlayer).where(
+            and_(
+                GamePlayer.game_id == SAMPLE_GAME_ID,
+                GamePlayer.user_id == SAMPLE_USER_ID
+            )
+        ),
+        "uq_game_players_game_id_user_id",
+    ),
+    (
+        "LocationRepository.get_all_for_group",
+        select(Location).where(
+            and_(
+                or_(
+                    Location.group_id == SAMPLE_GROUP_ID,
+                    Location.group_id.is_(None)
+                ),
+                Location.is_active == True
+            )
+        ),
+        "ix_locations_group_id_is_active",
+    ),
+    (
+        "LocationRepository.bulk_create (existing default names)",
+        select(Location.name_hash).where(
+            and_(
+                func.coalesce(Location.group_id, 0) == 0,
+                Location.name_hash.in_(["0123456789abcdef0123456789abcdef"]),
+                Location.is_active == True
+            )
+        ),
+        "uq_locations_scope_name_hash",
+    ),
+    (
+        "LocationRepository.pick_random_for_group (recent games)",
+        select(Game.location_id).where(
+            and_(
+                Game.group_id == SAMPLE_GROUP_ID,
+                Game.location_id.is_not(None)
+            )
+        ).order_by(Game.id.desc()).limit(5),
+        "ix_games_group_id_id",
+    ),
+    (
+        "GameRepository.close_stale_games",
+        select(Game.id).where(
+            and_(
+                Game.status.in_([GameStatus.REGISTRATION, GameStatus.IN_PROGRESS]),
+                Game.updated_at < datetime(2026, 1, 1)
+            )
+        ).order_by(Game.updated_at).limit(100),
+        "ix_games_status_updated_at",
+    ),
+]
+
+
+def prepare_statement(statement) -> tuple[str, list[str]]:
+    """SQL with $n placeholders as asyncpg sends it, and its parameters rendered as literals"""
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = [
+        str(literal(compiled.params[name]).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+        for name in compiled.positiontup
+    ]
+    return str(compiled), params
+
+
+async def explain_generic(driver, sql: str, params: list[str]) -> str:
+    """Plan of the prepared statement that is used for any parameter values"""
+    await driver.execute(f"PREPARE hot_query AS {sql}")
+    args = f"({', '.join(params)})" if params else ""
+    try:
+        rows = await driver.fetch(f"EXPLAIN EXECUTE hot_query{args}")
+    finally:
+        await driver.execute("DEALLOCATE hot_query")
+    return "\n".join(row[0] for row in rows)
+
+
+async def check_query_plans() -> bool:
+    """EXPLAIN every hot query and check that the expected index is used"""
+    ok = True
+    async with engine.connect() as conn:
+        driver = (await conn.get_raw_connection()).driver_connection
+        # A generic plan can't use a partial index unless the query's own predicate implies it
+        await driver.execute("SET plan_cache_mode = force_generic_plan")
+
+        for description, statement, index_name in HOT_QUERIES:
+            sql, params = prepare_statement(statement)
+            plan = await explain_generic(driver, sql, params)
+
+            if index_name in plan:
+                print(f"✅ {description}: uses {index_name}")
+            else:
+                ok = False
+                print(f"❌ {description}: {index_name} not used\n{plan}\n")
+
+    await engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check_query_plans()) else 1)
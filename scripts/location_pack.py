@@ -0,0 +1,74 @@
+"""
+Script to import or export location packs (CSV, JSON or JSON Lines)
+Import skips locations whose name already exists; without --group-id it
+works on default locations.
+
+    python scripts/location_pack.py import pack.csv [--group-id ID]
+    python scripts/location_pack.py export pack.json [--group-id ID]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.bot.utils.location_pack import import_locations, pack_format, read_pack, write_pack
+from app.database.database import async_session_maker, close_db
+from app.database.repositories.group import GroupRepository
+from app.database.repositories.location import LocationRepository
+
+
+async def import_pack(path: Path, fmt: str, group_id: Optional[int]) -> bool:
+    """Import pack file in batches, committed together"""
+    started = time.perf_counter()
+    async with async_session_maker() as session:
+        if group_id is not None and not await GroupRepository(session).get_by_id(group_id):
+            print(f"❌ Group {group_id} not found (add the bot to it first)")
+            return False
+
+        with path.open(encoding="utf-8-sig", newline="") as file:
+            result = await import_locations(LocationRepository(session), read_pack(file, fmt), group_id)
+        await session.commit()
+
+    print(
+        f"✅ Added {result.added} locations, skipped {result.skipped} existing "
+        f"and {result.invalid} invalid rows in {time.perf_counter() - started:.1f} s"
+    )
+    return True
+
+
+async def export_pack(path: Path, fmt: str, group_id: Optional[int]) -> bool:
+    """Export active locations with a server-side cursor"""
+    async with async_session_maker() as session:
+        with path.open("w", encoding="utf-8", newline="") as file:
+            count = await write_pack(file, fmt, LocationRepository(session).stream_for_group(group_id))
+
+    print(f"✅ Exported {count} locations to {path}")
+    return True
+
+
+async def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("path", type=Path, help=".csv, .json or .jsonl file")
+    parser.add_argument("--group-id", type=int, help="group chat ID, default locations if omitted")
+    args = parser.parse_args()
+
+    fmt = pack_format(args.path.name)
+    if not fmt:
+        parser.error("file must have a .csv, .json or .jsonl extension")
+
+    try:
+        if args.action == "import":
+            return await import_pack(args.path, fmt, args.group_id)
+        return await export_pack(args.path, fmt, args.group_id)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
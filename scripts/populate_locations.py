@@ -52,18 +52,12 @@ async def populate_locations():
     async with async_session_maker() as session:
         repo = LocationRepository(session)
         
-        # Check if locations already exist
-        existing = await repo.get_default_locations()
-        if existing:
-            print(f"Default locations already exist ({len(existing)} locations)")
-            return
-        
+        # One multi-row insert; locations that already exist are skipped
         print("Adding default locations...")
-        for loc_data in DEFAULT_LOCATIONS:
-            await repo.create(name_translations=loc_data, group_id=None)
-            print(f"Added: {loc_data['en']}")
+        added = await repo.bulk_create([(loc_data, []) for loc_data in DEFAULT_LOCATIONS])
+        await session.commit()
         
-        print(f"\n✅ Successfully added {len(DEFAULT_LOCATIONS)} default locations!")
+        print(f"\n✅ Added {added} default locations ({len(DEFAULT_LOCATIONS) - added} already existed)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""
+Script to check webhook mode end to end
+Starts the webhook server locally, posts recorded updates to it and checks
+that the bot answered them. Nothing is sent to Telegram: API calls are
+recorded by a fake session. Needs the database, like the other scripts.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Must be set before app.config is imported
+os.environ["RUN_MODE"] = "webhook"
+os.environ["BOT_TOKEN"] = "123456:SMOKE-TEST-TOKEN"
+os.environ["WEBHOOK_BASE_URL"] = "https://smoke-test.invalid"
+os.environ["WEBHOOK_SECRET"] = "smoke-test-secret"
+os.environ["WEBHOOK_DELETE_ON_SHUTDOWN"] = "True"
+
+from aiohttp import ClientSession, web
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message
+
+from app.config import settings
+from app.database.database import close_db
+from app.main import create_bot, create_dispatcher
+from app.bot.middlewares.outbound import outbound_scheduler
+from app.webhook import build_webhook_app
+
+
+SAMPLE_USER_ID = 123456789
+SAMPLE_GROUP_ID = -1001234567890
+HANDLE_TIMEOUT = 10  # seconds
+
+
+def command_update(update_id: int, chat: dict[str, Any], text: str) -> dict[str, Any]:
+    """Update as Telegram posts it for a command message"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": chat,
+            "from": {"id": SAMPLE_USER_ID, "is_bot": False, "first_name": "Smoke", "language_code": "en"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        }
+    }
+
+
+PRIVATE_CHAT = {"id": SAMPLE_USER_ID, "type": "private", "first_name": "Smoke"}
+GROUP_CHAT = {"id": SAMPLE_GROUP_ID, "type": "supergroup", "title": "Smoke test"}
+
+# (update, chat expected to get a message)
+RECORDED_UPDATES = [
+    (command_update(1, PRIVATE_CHAT, "/help"), SAMPLE_USER_ID),
+    (command_update(2, GROUP_CHAT, "/help"), SAMPLE_GROUP_ID),
+]
+UNAUTHORIZED_UPDATE = command_update(3, {**GROUP_CHAT, "id": SAMPLE_GROUP_ID - 1}, "/help")
+
+
+class RecordingSession(BaseSession):
+    """Bot session that records API calls instead of sending them"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests: list[TelegramMethod] = []
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.requests.append(method)
+        if method.__returning__ is Message:
+            chat_type = "private" if int(method.chat_id) > 0 else "supergroup"
+            return Message(
+                message_id=len(self.requests),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type=chat_type)
+            )
+        return True
+
+    async def stream_content(self, url: str, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+    def called(self, api_method: str, **fields: Any) -> bool:
+        return any(
+            request.__api_method__ == api_method
+            and all(getattr(request, name, None) == value for name, value in fields.items())
+            for request in self.requests
+        )
+
+
+async def wait_for(check, timeout: float) -> bool:
+    """Poll check() until it passes or the timeout runs out"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not check():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def run_smoke_test() -> bool:
+    session = RecordingSession()
+    bot = create_bot(session=session)
+    dp = create_dispatcher()
+
+    runner = web.AppRunner(build_webhook_app(bot, dp))
+    await runner.setup()
+    site = web.TCPSite(runner, host="127.0.0.1", port=0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}{settings.WEBHOOK_PATH}"
+
+    ok = True
+
+    def report(passed: bool, description: str) -> None:
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {description}")
+
+    try:
+        report(
+            session.called("setWebhook", url=settings.webhook_url, secret_token=settings.WEBHOOK_SECRET),
+            "webhook registered on startup"
+        )
+
+        async with ClientSession() as http:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": settings.WEBHOOK_SECRET}
+            for update, chat_id in RECORDED_UPDATES:
+                async with http.post(url, json=update, headers=headers) as response:
+                    report(response.status == 200, f"update {update['update_id']} accepted ({response.status})")
+                handled = await wait_for(lambda: session.called("sendMessage", chat_id=chat_id), HANDLE_TIMEOUT)
+                report(handled, f"update {update['update_id']} answered in chat {chat_id}")
+
+            bad_headers = {"X-Telegram-Bot-Api-Secret-Token": "wrong-secret"}
+            async with http.post(url, json=UNAUTHORIZED_UPDATE, headers=bad_headers) as response:
+                report(response.status == 401, f"update with wrong secret rejected ({response.status})")
+            await asyncio.sleep(1)
+            report(
+                not session.called("sendMessage", chat_id=UNAUTHORIZED_UPDATE["message"]["chat"]["id"]),
+                "update with wrong secret not handled"
+            )
+    finally:
+        await runner.cleanup()
+        await outbound_scheduler.close()
+        await close_db()
+
+    report(session.called("deleteWebhook"), "webhook removed on shutdown")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run_smoke_test()) else 1)